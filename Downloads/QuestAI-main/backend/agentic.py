@@ -1,19 +1,26 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
 import os
 
+from . import metrics
 from .schemas import GroupRequest, PlanResponse, PlanCard
 from .agents import ListenerAgent, WriterAgent, llm_json
+from .controller_state import encode_state
+from .dedup import dedupe_candidates
 from .tools import (
-    tool_get_user_taste,
+    tool_get_user_tastes_cached,
     tool_merge_tastes,
     tool_find_activities,
-    tool_get_user_taste_cached,
     tool_search_places_grid,
     tool_sentiment_enrich,
     tool_calendar_probe,
     tool_reserve_table,
 )
-from .prompts import SYSTEM_CONTROLLER
+from .prompts import SYSTEM_CONTROLLER, SYSTEM_CONTROLLER_PLAN
+
+# Plan mode (AGENTIC_PLAN_MODE=1): how often the controller may re-plan, and how many actions it may run in total.
+MAX_REPLANS = int(os.getenv("AGENTIC_MAX_REPLANS", "2"))
+MAX_PLAN_ACTIONS = int(os.getenv("AGENTIC_MAX_PLAN_ACTIONS", "12"))
 
 
 class AgenticController:
@@ -66,25 +73,234 @@ class AgenticController:
 
         return merged
 
-    def _decide(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def _load_tastes(self, state: Dict[str, Any], user_ids: List[str]) -> List[Any]:
+        tastes, missing = await tool_get_user_tastes_cached(user_ids, state.get("friend_overrides"))
+        if missing:
+            state["observations"].append(f"No saved profile for {', '.join(missing)}; using defaults")
+        return tastes
+
+    async def _decide(self, state: Dict[str, Any]) -> Dict[str, Any]:
         # Ask LLM controller which tool to call next
-        prompt = {
-            "query": state.get("query"),
-            "listener": state.get("listener"),
-            "tastes": [t.model_dump() if hasattr(t, "model_dump") else dict(t) for t in state.get("tastes", [])],
-            "merged": state.get("merged"),
-            "observations": state.get("observations", []),
-        }
-        return llm_json(
-            prompt=str(prompt),
+        return await llm_json(
+            prompt=encode_state(state),
             system=SYSTEM_CONTROLLER,
         ) or {}
 
-    def run(self, req: GroupRequest) -> PlanResponse:
+    async def _plan(self, state: Dict[str, Any], reason: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Ask the LLM for an ordered multi-action plan instead of a single next step
+        prompt = encode_state(state, extra={"replan_reason": reason} if reason else None)
+        decision = await llm_json(prompt=prompt, system=SYSTEM_CONTROLLER_PLAN) or {}
+        steps = decision.get("plan")
+        if not steps and decision.get("action"):
+            # Tolerate a single-step answer in the step-mode schema.
+            steps = [decision]
+        plan: List[Dict[str, Any]] = []
+        for step in steps or []:
+            if not isinstance(step, dict) or not step.get("action"):
+                continue
+            if step["action"] != "finalize" and step["action"] not in _ACTION_EFFECTS:
+                state["observations"].append(f"Ignored unknown planned action {step['action']}")
+                continue
+            plan.append(step)
+        return plan
+
+    async def _execute(
+        self,
+        action: str,
+        args: Dict[str, Any],
+        state: Dict[str, Any],
+        action_log: List[str],
+    ) -> bool:
+        """Run one non-finalize tool action against ``state``. Returns False for unknown actions."""
+        # Unknown actions share one label so LLM output can't blow up metric cardinality.
+        with metrics.stage(f"agentic:{action if action in _ACTION_EFFECTS else 'unknown'}"):
+            return await self._dispatch(action, args, state, action_log)
+
+    async def _dispatch(
+        self,
+        action: str,
+        args: Dict[str, Any],
+        state: Dict[str, Any],
+        action_log: List[str],
+    ) -> bool:
+        if action == "get_tastes":
+            user_ids = args.get("user_ids") or state["user_ids"]
+            tastes = await self._load_tastes(state, user_ids)
+            state["tastes"] = tastes
+            obs = f"Fetched tastes for {len(tastes)} users"
+            state["observations"].append(obs)
+            action_log.append("Controller:get_tastes")
+            return True
+
+        if action == "merge_tastes":
+            if not state["tastes"]:
+                # Ensure precondition
+                tastes = await self._load_tastes(state, state["user_ids"])
+                state["tastes"] = tastes
+            merged = tool_merge_tastes(state["tastes"])
+            overrides = (args.get("overrides") or {})
+            merged = self._apply_request_overrides(merged, state, overrides)
+            state["merged"] = merged
+            obs = f"Merged tastes → vibe={merged.get('vibe')} budget_cap={merged.get('budget_cap')}"
+            state["observations"].append(obs)
+            action_log.append("Controller:merge_tastes")
+            return True
+
+        if action == "find_activities":
+            if not state.get("merged"):
+                # Merge if not done
+                merged = tool_merge_tastes(state["tastes"])
+                merged = self._apply_request_overrides(merged, state)
+                state["merged"] = merged
+            raw = await tool_find_activities(state["merged"])
+            state["raw_candidates"] = raw
+            obs = f"Found {len(raw)} activities"
+            state["observations"].append(obs)
+            action_log.append("Controller:find_activities")
+            return True
+
+        if action == "search_places_grid":
+            merged = state.get("merged")
+            if not merged:
+                # ensure merged exists
+                if not state["tastes"]:
+                    state["tastes"] = await self._load_tastes(state, state["user_ids"])
+                merged = tool_merge_tastes(state["tastes"])
+            merged = self._apply_request_overrides(merged, state)
+            state["merged"] = merged
+            grid = await tool_search_places_grid(merged)
+            # prefer union with prior candidates
+            prev = state.get("raw_candidates") or []
+            state["raw_candidates"] = dedupe_candidates(prev + grid, merged.get("location"))
+            obs = f"Grid search yielded {len(grid)} candidates"
+            state["observations"].append(obs)
+            action_log.append("Controller:search_places_grid")
+            return True
+
+        if action == "enrich_sentiment":
+            prev = state.get("raw_candidates") or []
+            enriched = tool_sentiment_enrich(prev)
+            state["raw_candidates"] = enriched
+            obs = "Enriched candidates with sentiment"
+            state["observations"].append(obs)
+            action_log.append("Controller:enrich_sentiment")
+            return True
+
+        if action == "probe_calendar":
+            cal = await tool_calendar_probe(state["user_ids"], state.get("time_window"))
+            state["observations"].append(f"Calendar probe: {cal.get('availability')}")
+            action_log.append("Controller:probe_calendar")
+            return True
+
+        if action == "reserve":
+            idx = args.get("index", 0)
+            pool = state.get("raw_candidates") or []
+            if pool and 0 <= idx < len(pool):
+                res = await tool_reserve_table(pool[idx])
+                state["observations"].append(f"Reservation: {res.get('reservation_supported')}")
+            action_log.append("Controller:reserve")
+            return True
+
+        return False
+
+    def _finalize(self, state: Dict[str, Any], action_log: List[str], note: str = "") -> PlanResponse:
+        merged = state.get("merged") or {}
+        p_out = {"merged": merged, "raw_candidates": state.get("raw_candidates", [])}
+        cards = self.writer.run(p_out)
+        action_log.append(f"Writer: scored {len(cards)} candidates{note}")
+        return PlanResponse(
+            query_normalized=state["query"],
+            merged_vibe=merged.get("vibe", "chill") if merged else "chill",
+            energy_profile=merged.get("energy_level", "medium") if merged else "medium",
+            candidates=cards,
+            action_log=action_log,
+        )
+
+    async def _default_plan(self, state: Dict[str, Any], action_log: List[str]) -> PlanResponse:
+        # Fallback: get tastes → merge → search → write
+        tastes = await self._load_tastes(state, state["user_ids"])
+        merged = tool_merge_tastes(tastes)
+        merged = self._apply_request_overrides(merged, state)
+        raw = await tool_find_activities(merged)
+        cards = self.writer.run({"merged": merged, "raw_candidates": raw})
+        return PlanResponse(
+            query_normalized=state["query"],
+            merged_vibe=merged.get("vibe", "chill"),
+            energy_profile=merged.get("energy_level", "medium"),
+            candidates=cards,
+            action_log=action_log + [
+                "Planner: merged tastes & fetched activities (fallback)",
+                f"Writer: scored {len(cards)} candidates",
+            ],
+        )
+
+    async def _run_steps(self, state: Dict[str, Any], action_log: List[str]) -> PlanResponse:
+        for step in range(1, 8):
+            decision = await self._decide(state)
+            action = decision.get("action")
+            args = decision.get("args") or {}
+            rationale = decision.get("rationale") or ""
+
+            if not action:
+                # Build a default path if LLM is disabled or fails
+                return await self._default_plan(state, action_log)
+
+            if action == "finalize":
+                return self._finalize(state, action_log)
+
+            if not await self._execute(action, args, state, action_log):
+                # Safety: if an unknown action is returned, break to fallback
+                break
+
+        # If loop exits without finalize, return fallback
+        return self._finalize(state, action_log, " (loop-exit)")
+
+    async def _run_plan(self, state: Dict[str, Any], action_log: List[str]) -> PlanResponse:
+        """
+        Plan mode: one LLM call returns an ordered action list, executed as a DAG
+        (independent actions run concurrently). The LLM is consulted again only
+        when an observation invalidates the remaining plan.
+        """
+        steps = await self._plan(state)
+        if not steps:
+            return await self._default_plan(state, action_log)
+
+        executed = 0
+        for replan in range(MAX_REPLANS + 1):
+            action_log.append(f"Controller:plan({len(steps)} actions)")
+            invalid_reason: Optional[str] = None
+            for layer in _plan_layers(steps):
+                finals = [steps[i] for i in layer if steps[i]["action"] == "finalize"]
+                runnable = [steps[i] for i in layer if steps[i]["action"] != "finalize"]
+                executed += len(runnable)
+                outcomes = await asyncio.gather(
+                    *(self._execute(st["action"], st.get("args") or {}, state, action_log) for st in runnable),
+                    return_exceptions=True,
+                )
+                invalid_reason = _invalidation_reason(runnable, outcomes, state)
+                if invalid_reason:
+                    break
+                if finals:
+                    return self._finalize(state, action_log)
+                if executed >= MAX_PLAN_ACTIONS:
+                    break
+            else:
+                invalid_reason = "plan ended without finalize"
+
+            if executed >= MAX_PLAN_ACTIONS or replan == MAX_REPLANS:
+                break
+            state["observations"].append(f"Replanning: {invalid_reason}")
+            steps = await self._plan(state, reason=invalid_reason)
+            if not steps:
+                break
+
+        return self._finalize(state, action_log, " (plan-exit)")
+
+    async def run(self, req: GroupRequest) -> PlanResponse:
         action_log: List[str] = []
 
         # Seed with listener intent to keep controller lightweight
-        listener_out = self.listener.run(req.query_text)
+        listener_out = await self.listener.run(req.query_text)
         action_log.append("Listener: parsed vibes/time/budget")
 
         state: Dict[str, Any] = {
@@ -102,147 +318,68 @@ class AgenticController:
             "budget_cap_override": req.budget_cap,
             "distance_override": req.distance_km,
             "vibe_hint": req.vibe_hint,
+            "friend_overrides": {o.user_id: o for o in req.friend_overrides},
         }
 
-        # Default deterministic path if controller cannot produce actions
-        default_plan: Optional[PlanResponse] = None
-
-        for step in range(1, 8):
-            decision = self._decide(state)
-            action = decision.get("action")
-            args = decision.get("args") or {}
-            rationale = decision.get("rationale") or ""
-
-            if not action:
-                # Build a default path once; if LLM is disabled or fails
-                if default_plan is None:
-                    # Fallback: get tastes → merge → search → write
-                    tastes = [tool_get_user_taste(uid) for uid in req.user_ids]
-                    merged = tool_merge_tastes(tastes)
-                    merged = self._apply_request_overrides(merged, state)
-                    raw = tool_find_activities(merged)
-                    cards = self.writer.run({"merged": merged, "raw_candidates": raw})
-                    default_plan = PlanResponse(
-                        query_normalized=state["query"],
-                        merged_vibe=merged.get("vibe", "chill"),
-                        energy_profile=merged.get("energy_level", "medium"),
-                        candidates=cards,
-                        action_log=action_log + [
-                            "Planner: merged tastes & fetched activities (fallback)",
-                            f"Writer: scored {len(cards)} candidates",
-                        ],
-                    )
-                return default_plan
-
-            if action == "get_tastes":
-                user_ids = args.get("user_ids") or state["user_ids"]
-                tastes = [tool_get_user_taste_cached(uid) for uid in user_ids]
-                state["tastes"] = tastes
-                obs = f"Fetched tastes for {len(tastes)} users"
-                state["observations"].append(obs)
-                action_log.append("Controller:get_tastes")
-                continue
-
-            if action == "merge_tastes":
-                if not state["tastes"]:
-                    # Ensure precondition
-                    tastes = [tool_get_user_taste(uid) for uid in state["user_ids"]]
-                    state["tastes"] = tastes
-                merged = tool_merge_tastes(state["tastes"])
-                overrides = (args.get("overrides") or {})
-                merged = self._apply_request_overrides(merged, state, overrides)
-                state["merged"] = merged
-                obs = f"Merged tastes → vibe={merged.get('vibe')} budget_cap={merged.get('budget_cap')}"
-                state["observations"].append(obs)
-                action_log.append("Controller:merge_tastes")
-                continue
-
-            if action == "find_activities":
-                if not state.get("merged"):
-                    # Merge if not done
-                    merged = tool_merge_tastes(state["tastes"])
-                    merged = self._apply_request_overrides(merged, state)
-                    state["merged"] = merged
-                raw = tool_find_activities(state["merged"])
-                state["raw_candidates"] = raw
-                obs = f"Found {len(raw)} activities"
-                state["observations"].append(obs)
-                action_log.append("Controller:find_activities")
-                continue
+        if os.getenv("AGENTIC_PLAN_MODE") == "1":
+            return await self._run_plan(state, action_log)
+        return await self._run_steps(state, action_log)
 
-            if action == "search_places_grid":
-                merged = state.get("merged")
-                if not merged:
-                    # ensure merged exists
-                    if not state["tastes"]:
-                        state["tastes"] = [tool_get_user_taste_cached(uid) for uid in state["user_ids"]]
-                    merged = tool_merge_tastes(state["tastes"])
-                merged = self._apply_request_overrides(merged, state)
-                state["merged"] = merged
-                grid = tool_search_places_grid(merged)
-                # prefer union with prior candidates
-                prev = state.get("raw_candidates") or []
-                state["raw_candidates"] = (prev or []) + grid
-                obs = f"Grid search yielded {len(grid)} candidates"
-                state["observations"].append(obs)
-                action_log.append("Controller:search_places_grid")
-                continue
 
-            if action == "enrich_sentiment":
-                prev = state.get("raw_candidates") or []
-                enriched = tool_sentiment_enrich(prev)
-                state["raw_candidates"] = enriched
-                obs = "Enriched candidates with sentiment"
-                state["observations"].append(obs)
-                action_log.append("Controller:enrich_sentiment")
-                continue
+# State keys each action reads and writes; used to derive ordering between plan steps.
+_ACTION_EFFECTS: Dict[str, Tuple[Set[str], Set[str]]] = {
+    "get_tastes": ({"user_ids"}, {"tastes"}),
+    "merge_tastes": ({"tastes"}, {"tastes", "merged"}),
+    "find_activities": ({"tastes", "merged"}, {"merged", "raw_candidates"}),
+    "search_places_grid": ({"tastes", "merged", "raw_candidates"}, {"tastes", "merged", "raw_candidates"}),
+    "enrich_sentiment": ({"raw_candidates"}, {"raw_candidates"}),
+    "probe_calendar": ({"user_ids"}, set()),
+    "reserve": ({"raw_candidates"}, set()),
+}
 
-            if action == "probe_calendar":
-                cal = tool_calendar_probe(state["user_ids"], state.get("time_window"))
-                state["observations"].append(f"Calendar probe: {cal.get('availability')}")
-                action_log.append("Controller:probe_calendar")
-                continue
 
-            if action == "reserve":
-                idx = args.get("index", 0)
-                pool = state.get("raw_candidates") or []
-                if pool and 0 <= idx < len(pool):
-                    res = tool_reserve_table(pool[idx])
-                    state["observations"].append(f"Reservation: {res.get('reservation_supported')}")
-                action_log.append("Controller:reserve")
-                continue
+def _plan_layers(steps: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Group plan steps into layers that can run concurrently. Step j waits for an
+    earlier step i when the LLM listed i in j's ``after``, when their state
+    reads/writes conflict, or when j is ``finalize`` (a barrier).
+    """
+    ids = {str(st.get("id", idx)): idx for idx, st in enumerate(steps)}
+    deps: List[Set[int]] = []
+    for j, step in enumerate(steps):
+        wanted = {ids[str(a)] for a in step.get("after") or [] if str(a) in ids and ids[str(a)] < j}
+        if step["action"] == "finalize":
+            wanted.update(range(j))
+        else:
+            reads_j, writes_j = _ACTION_EFFECTS.get(step["action"], (set(), set()))
+            for i in range(j):
+                reads_i, writes_i = _ACTION_EFFECTS.get(steps[i]["action"], (set(), set()))
+                if writes_i & (reads_j | writes_j) or reads_i & writes_j:
+                    wanted.add(i)
+        deps.append(wanted)
 
-            if action == "finalize":
-                merged = state.get("merged") or {}
-                p_out = {"merged": merged, "raw_candidates": state.get("raw_candidates", [])}
-                cards = self.writer.run(p_out)
-                action_log.append(f"Writer: scored {len(cards)} candidates")
-                return PlanResponse(
-                    query_normalized=state["query"],
-                    merged_vibe=merged.get("vibe", "chill"),
-                    energy_profile=merged.get("energy_level", "medium"),
-                    candidates=cards,
-                    action_log=action_log,
-                )
+    layers: List[List[int]] = []
+    level: List[int] = []
+    for j in range(len(steps)):
+        level.append(max((level[i] + 1 for i in deps[j]), default=0))
+        if level[j] == len(layers):
+            layers.append([])
+        layers[level[j]].append(j)
+    return layers
 
-            # Safety: if an unknown action is returned, break to fallback
-            break
 
-        # If loop exits without finalize, return fallback
-        merged = state.get("merged") or {}
-        p_out = {"merged": merged, "raw_candidates": state.get("raw_candidates", [])}
-        cards = self.writer.run(p_out)
-        action_log.append(f"Writer: scored {len(cards)} candidates (loop-exit)")
-        return PlanResponse(
-            query_normalized=state["query"],
-            merged_vibe=merged.get("vibe", "chill") if merged else "chill",
-            energy_profile=merged.get("energy_level", "medium") if merged else "medium",
-            candidates=cards,
-            action_log=action_log,
-        )
+def _invalidation_reason(
+    steps: List[Dict[str, Any]], outcomes: List[Any], state: Dict[str, Any]
+) -> Optional[str]:
+    for step, outcome in zip(steps, outcomes):
+        if isinstance(outcome, Exception):
+            return f"{step['action']} failed: {outcome}"
+        if step["action"] in {"find_activities", "search_places_grid"} and not state.get("raw_candidates"):
+            return f"{step['action']} returned no candidates"
+    return None
 
 
-def agentic_plan(req: GroupRequest) -> PlanResponse:
-    return AgenticController().run(req)
+async def agentic_plan(req: GroupRequest) -> PlanResponse:
+    return await AgenticController().run(req)
 
 
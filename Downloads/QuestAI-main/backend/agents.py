@@ -1,45 +1,155 @@
 # backend/agents.py
+import asyncio
 import json
+import logging
 import os
+import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+from . import llm_cache, resilience, scoring, tracing
+from .http_client import get_async_client
+from .metrics import timed
 from .prompts import SYSTEM_LISTENER, SYSTEM_PLANNER, SYSTEM_WRITER
-from .schemas import UserTaste, PlanCard
-from .tools import tool_get_user_taste, tool_merge_tastes, tool_find_activities
+from .schemas import UserTaste, PlanCard, FriendOverride
+from .singleflight import SingleFlight
+from .tools import tool_get_user_tastes_cached, tool_merge_tastes, tool_find_activities
 
-def llm_json(prompt: str, system: str) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "20"))
+WRITER_TOP_N = int(os.getenv("WRITER_TOP_N", "5"))
+# When set, Gemini is called over REST at this root instead of through the SDK.
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "").rstrip("/")
+
+_llm_stats: Dict[str, Dict[str, float]] = {}
+_llm_flight = SingleFlight("llm")
+
+
+def _record_llm_call(system: str, latency_s: float, outcome: str) -> None:
+    name = llm_cache.system_name(system) or "other"
+    entry = _llm_stats.setdefault(
+        name,
+        {"calls": 0, "failures": 0, "timeouts": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0},
+    )
+    entry["calls"] += 1
+    if outcome == "timeout":
+        entry["timeouts"] += 1
+    if outcome != "ok":
+        entry["failures"] += 1
+    latency_ms = latency_s * 1000
+    entry["latency_ms_total"] += latency_ms
+    entry["latency_ms_max"] = max(entry["latency_ms_max"], latency_ms)
+
+
+def llm_stats() -> Dict[str, Any]:
+    """Per-system-prompt Gemini call counts, failures and latency, for /api/v1/stats."""
+    return {
+        name: {
+            **entry,
+            "latency_ms_total": round(entry["latency_ms_total"], 1),
+            "latency_ms_max": round(entry["latency_ms_max"], 1),
+            "latency_ms_avg": round(entry["latency_ms_total"] / entry["calls"], 1) if entry["calls"] else 0.0,
+        }
+        for name, entry in _llm_stats.items()
+    }
+
+
+@lru_cache(maxsize=4)
+def _gemini_model(api_key: str, model_name: str) -> Any:
+    # Configure the SDK and build the model once per (key, model) instead of per call.
+    import google.generativeai as genai  # type: ignore
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+async def _gemini_rest_text(message: str, api_key: str, model_name: str, timeout: float) -> str:
+    """``generateContent`` over plain REST, for when ``GEMINI_API_BASE`` points at a proxy or stand-in."""
+    resp = await get_async_client().post(
+        f"{GEMINI_API_BASE}/v1beta/models/{model_name}:generateContent",
+        params={"key": api_key},
+        json={
+            "contents": [{"role": "user", "parts": [{"text": message}]}],
+            "generationConfig": {"temperature": 0.1, "responseMimeType": "application/json"},
+        },
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    candidates = resp.json().get("candidates") or [{}]
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text") or "" for part in parts)
+
+
+@timed("gemini")
+async def _gemini_json(prompt: str, system: str, api_key: str, model_name: str) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    outcome = "error"
+    message = f"{system.strip()}\n\nUser request:\n{prompt.strip()}\n\nRespond with compact JSON only."
+    # One deadline for the whole call (rate-limit wait, attempts and retry backoff), not per attempt.
+    deadline = time.monotonic() + GEMINI_TIMEOUT_S
+
+    def remaining() -> float:
+        return max(deadline - time.monotonic(), 0.1)
+
+    async def attempt() -> Optional[str]:
+        if GEMINI_API_BASE:
+            return await _gemini_rest_text(message, api_key, model_name, remaining())
+        model = _gemini_model(api_key, model_name)
+        response = await model.generate_content_async(
+            [{"role": "user", "parts": [message]}],
+            generation_config={
+                "temperature": 0.1,
+                "response_mime_type": "application/json",
+            },
+            request_options={"timeout": remaining()},
+        )
+        text = getattr(response, "text", None)
+        if not text and response.candidates:
+            text = "".join(
+                part.text or ""
+                for part in response.candidates[0].content.parts
+            )
+        return text
+
+    try:
+        text = await asyncio.wait_for(resilience.call("gemini", attempt, deadline), timeout=GEMINI_TIMEOUT_S)
+        if text:
+            result = json.loads(text)
+            outcome = "ok"
+            llm_cache.put(system, prompt, model_name, result)
+            return result
+        logger.warning("Gemini returned an empty response.")
+    except resilience.RejectedError as exc:
+        outcome = "rejected"
+        logger.info("Gemini call rejected (%s); using fallback.", exc)
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        logger.warning("Gemini call timed out after %.1fs; using fallback.", GEMINI_TIMEOUT_S)
+    except Exception as exc:  # pylint: disable=broad-except
+        # Fall back to deterministic mock response if Gemini fails.
+        logger.warning("Gemini call failed; using fallback: %s", exc)
+    finally:
+        _record_llm_call(system, time.perf_counter() - started, outcome)
+    return None
+
+
+@timed()
+async def llm_json(prompt: str, system: str) -> Dict[str, Any]:
+    tracing.set_attribute("llm.system", llm_cache.system_name(system) or "other")
     api_key = os.getenv("GEMINI_API_KEY")
     if api_key:
-        try:
-            import google.generativeai as genai  # type: ignore
-
-            genai.configure(api_key=api_key)
-            model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(
-                [
-                    {
-                        "role": "user",
-                        "parts": [
-                            f"{system.strip()}\n\nUser request:\n{prompt.strip()}\n\nRespond with compact JSON only."
-                        ],
-                    }
-                ],
-                generation_config={
-                    "temperature": 0.1,
-                    "response_mime_type": "application/json",
-                },
-            )
-            text = getattr(response, "text", None)
-            if not text and response.candidates:
-                text = "".join(
-                    part.text or ""
-                    for part in response.candidates[0].content.parts
-                )
-            if text:
-                return json.loads(text)
-        except Exception:
-            # Fall back to deterministic mock response if Gemini fails.
-            pass
+        model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        cached = llm_cache.get(system, prompt, model_name)
+        tracing.set_attribute("cache.hit", cached is not None)
+        if cached is not None:
+            return cached
+        # Identical prompts in flight at the same time share one Gemini call.
+        result = await _llm_flight.do(
+            llm_cache.cache_key(system, prompt, model_name),
+            lambda: _gemini_json(prompt, system, api_key, model_name),
+        )
+        if result is not None:
+            return result
 
     # Mock fallback for local development without Gemini access.
     if system == SYSTEM_LISTENER:
@@ -53,12 +163,27 @@ def llm_json(prompt: str, system: str) -> Dict[str, Any]:
     return {}
 
 class ListenerAgent:
-    def run(self, query_text: str) -> Dict[str, Any]:
+    @timed("listener")
+    async def run(self, query_text: str) -> Dict[str, Any]:
         # In production: call your real LLM with SYSTEM_LISTENER
-        return llm_json(prompt=query_text, system=SYSTEM_LISTENER)
+        return await llm_json(prompt=query_text, system=SYSTEM_LISTENER)
 
 class PlannerAgent:
-    def run(
+    @timed("planner")
+    async def run(
+        self,
+        user_ids: List[str],
+        listener_out: Dict[str, Any],
+        location_hint: str,
+        time_window: Optional[str],
+        request_overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        out = await self.prepare(user_ids, listener_out, location_hint, time_window, request_overrides)
+        # 3) search activities
+        out["raw_candidates"] = await tool_find_activities(out["merged"])
+        return out
+
+    async def prepare(
         self,
         user_ids: List[str],
         listener_out: Dict[str, Any],
@@ -66,13 +191,17 @@ class PlannerAgent:
         time_window: Optional[str],
         request_overrides: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
+        # Tastes + merged constraints only; streaming plans run the search themselves.
+        overrides = request_overrides or {}
+        friend_overrides = {
+            o["user_id"]: FriendOverride(**o) for o in overrides.get("friend_overrides") or []
+        }
         # 1) fetch tastes
-        tastes = [tool_get_user_taste(uid) for uid in user_ids]
+        tastes, missing_user_ids = await tool_get_user_tastes_cached(user_ids, friend_overrides)
         # 2) merge constraints and preferences
         merged = tool_merge_tastes(tastes)
         merged["location"] = location_hint
         merged["time_window"] = time_window or listener_out.get("time_hint")
-        overrides = request_overrides or {}
         if overrides.get("budget_cap") is not None:
             merged["budget_cap"] = overrides["budget_cap"]
         if overrides.get("distance_km") is not None:
@@ -91,33 +220,25 @@ class PlannerAgent:
             or (listener_vibes[0] if listener_vibes else merged_vibe_default)
         )
         merged["energy_level"] = listener_out.get("energy_level", "medium")
-        # 3) search activities
-        raw = tool_find_activities(merged)
-        return {"tastes": tastes, "merged": merged, "raw_candidates": raw}
+        return {
+            "tastes": tastes,
+            "missing_user_ids": missing_user_ids,
+            "merged": merged,
+        }
 
 class WriterAgent:
+    # Pure in-process scoring; stays synchronous so it never yields mid-rank.
+    def __init__(self, top_n: int = WRITER_TOP_N) -> None:
+        self.top_n = top_n
+
+    @timed("writer")
     def run(self, planner_out: Dict[str, Any]) -> List[PlanCard]:
         merged = planner_out["merged"]
-        cards: List[PlanCard] = []
-
-        for r in planner_out["raw_candidates"]:
-            # basic scoring
-            score = 0.4
-            candidate_vibe = str(r.get("vibe") or merged.get("vibe") or "").lower()
-            merged_vibe = str(merged.get("vibe") or "").lower()
-            if candidate_vibe and merged_vibe and candidate_vibe == merged_vibe:
-                score += 0.3
-
-            price = str(r.get("price", "")).lower()
-            budget_cap = merged.get("budget_cap")
-            if price == "free" or (price == "$" and (budget_cap is None or budget_cap >= 10)):
-                score += 0.2
-
-            # small boost for overlapping tags/likes
-            if any(t in (r.get("tags") or []) for t in merged.get("likes", [])):
-                score += 0.1
-
-            cards.append(PlanCard(
+        # Score the whole pool in one vectorised pass; only the winners become PlanCards.
+        winners = scoring.pick(planner_out["raw_candidates"], merged, self.top_n)
+
+        return [
+            PlanCard(
                 title=r["title"],
                 subtitle=None,
                 time=merged.get("time_window"),
@@ -131,17 +252,14 @@ class WriterAgent:
                 booking_url=r.get("booking_url"),
                 maps_url=r.get("maps_url"),
                 summary=r.get("summary"),
-                group_score=min(score, 1.0),
+                group_score=score,
                 reasons=[
                     f"Matches vibe: {merged.get('vibe')}",
                     f"Budget OK: {r.get('price')}",
                     f"Energy: {merged.get('energy_level', 'medium')}",
-                    f"Distance ≈ {r.get('distance_km')} km"
+                    f"Distance ≈ {r['distance_km']} km" if r.get("distance_km") is not None else "Distance unknown"
                 ],
                 source=r.get("source", "cached")
-            ))
-
-        # sort by best fit
-        cards.sort(key=lambda c: c.group_score, reverse=True)
-        # return top 3–5
-        return cards[:5]
+            )
+            for r, score in winners
+        ]
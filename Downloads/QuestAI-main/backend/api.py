@@ -5,15 +5,38 @@ Run locally:
     uvicorn backend.api:app --reload --host 0.0.0.0 --port 8000
 """
 
-from fastapi import FastAPI, Query
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import json
+from contextlib import asynccontextmanager
 
-from .orchestrator import plan
+from fastapi import FastAPI, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from . import cache, http_client, llm_cache, metrics, tracing
+from .agents import llm_stats
+from .orchestrator import plan, plan_stream
+from .providers import provider_cache_stats
+from .resilience import resilience_stats
+from .singleflight import singleflight_stats
 from .schemas import GroupRequest, PlanResponse, EventItem
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from .mock_events import search_mock_events
+from .tools import cache_stats, invalidate_user_taste
+
 
-app = FastAPI(title="Vivi Planner API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm the shared connection pool so the first plan doesn't pay for it.
+    http_client.get_async_client()
+    # Persistent caches read their SQLite rows here, off the event loop, instead of on the first plan.
+    await asyncio.to_thread(cache.load_persistent_caches)
+    yield
+    await http_client.aclose_client()
+    cache.flush_persistent_caches()
+
+
+app = FastAPI(title="Vivi Planner API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,12 +52,71 @@ def healthcheck() -> dict:
     return {"status": "ok", "service": "vivi-planner"}
 
 
+@app.get("/api/v1/stats")
+def service_stats() -> Dict[str, Any]:
+    """
+    Connection-pool and cache counters for capacity tuning.
+    """
+    return {
+        "http_pool": http_client.pool_stats(),
+        "caches": {**cache_stats(), "llm": llm_cache.stats(), "providers": provider_cache_stats()},
+        "llm": llm_stats(),
+        "singleflight": singleflight_stats(),
+        "resilience": resilience_stats(),
+        "tracing": tracing.tracing_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Per-stage latency histograms and call counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/v1/plan", response_model=PlanResponse)
-def create_plan(req: GroupRequest) -> PlanResponse:
+async def create_plan(req: GroupRequest, request: Request) -> PlanResponse:
     """
     Execute the listener → planner → writer pipeline and return ranked plan cards.
+    Runs on the event loop, so slow upstreams don't pin a worker thread each.
+    A W3C `traceparent` header joins the caller's trace.
+    """
+    with tracing.remote_parent(request.headers.get("traceparent")):
+        return await plan(req)
+
+
+@app.post("/api/v1/plan/stream")
+async def stream_plan(req: GroupRequest, request: Request) -> StreamingResponse:
+    """
+    Same pipeline as `/api/v1/plan`, streamed: progress `action` events, `cards`
+    as soon as the first provider answers (re-ranked as others arrive), then
+    the final `plan`. Newline-delimited JSON by default; Server-Sent Events
+    when the client sends `Accept: text/event-stream`.
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    traceparent = request.headers.get("traceparent")
+
+    async def body() -> AsyncIterator[str]:
+        with tracing.remote_parent(traceparent):
+            async for event in plan_stream(req):
+                data = json.dumps(event, default=str)
+                yield f"event: {event['type']}\ndata: {data}\n\n" if sse else data + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # Keep proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/v1/profiles/{user_id}/invalidate")
+def invalidate_profile(user_id: str) -> Dict[str, Any]:
+    """
+    Drop a user's cached taste so the next plan re-reads their profile.
+    Call this after a profile edit.
     """
-    return plan(req)
+    return {"user_id": user_id, "invalidated": invalidate_user_taste(user_id)}
 
 
 @app.get("/api/v1/events", response_model=List[EventItem])
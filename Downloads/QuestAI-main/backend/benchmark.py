@@ -0,0 +1,539 @@
+"""
+Offline end-to-end benchmark for ``POST /api/v1/plan``.
+
+Starts one local stand-in server speaking just enough of the Google
+Geocoding/Places, Eventbrite, Supabase (PostgREST) and Gemini REST APIs,
+with configurable latency, error rate and result sizes. It then launches
+the API under uvicorn, pointed at the stand-in through the ``*_API_BASE`` /
+``SUPABASE_URL`` settings, and drives it at a fixed concurrency. Each mode
+(``pipeline`` = ``orchestrator.plan``, ``agentic`` = ``USE_AGENTIC=1``) gets
+a fresh app process, so caches and circuit breakers start cold.
+
+Run from the project root:
+    python -m backend.benchmark --requests 200 --concurrency 16
+    python -m backend.benchmark --modes agentic --latency-ms 80 --error-rate 0.05
+    python -m backend.benchmark --json-out bench.json
+    python -m backend.benchmark --baseline bench.json --max-regression 0.2
+    RESILIENCE_EVENTBRITE_RPS=5 python -m backend.benchmark --rate-limits default
+
+Rate limits are off unless ``--rate-limits default`` keeps the app's own
+``RESILIENCE_*_RPS`` settings from the environment. Each mode's circuit
+breaker and throttling counters (from ``/api/v1/stats``, warm-up included)
+are printed under the latency table.
+
+With ``--baseline`` the exit status is 1 when p95 latency grows, or
+requests/sec drops, by more than ``--max-regression`` for any mode.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("pipeline", "agentic")
+# supabase-py wants a JWT-shaped key; the stand-in never checks it.
+_FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark"
+
+_QUERIES = [
+    "outdoorsy with live music after work, nothing pricey",
+    "chill creative night, maybe a workshop",
+    "high energy party vibes this weekend",
+    "cheap food and a walk by the water",
+    "something artsy and indoors, it's raining",
+    "board games or trivia with friends",
+]
+_LOCATIONS = ["Cambridge, MA", "Somerville, MA", "Boston, MA", "Brookline, MA"]
+_VIBES = ["music", "outdoors", "creative", "party", "chill", "food"]
+
+
+@dataclass
+class StandinProfile:
+    latency_ms: float = 40.0
+    llm_latency_ms: float = 400.0
+    # Each response waits latency * uniform(1 - jitter, 1 + jitter).
+    jitter: float = 0.25
+    error_rate: float = 0.0
+    places_results: int = 20
+    places_pages: int = 1
+    eventbrite_results: int = 25
+    eventbrite_pages: int = 2
+
+
+def _seed(*parts: Any) -> int:
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8"))
+
+
+def _point(*parts: Any) -> Tuple[float, float]:
+    """A stable pseudo-random point around Boston for ``parts``."""
+    rng = random.Random(_seed(*parts))
+    return 42.36 + rng.uniform(-0.05, 0.05), -71.08 + rng.uniform(-0.07, 0.07)
+
+
+def _place(i: int, key: str) -> Dict[str, Any]:
+    lat, lng = _point("place", key, i)
+    rng = random.Random(_seed("place-meta", key, i))
+    return {
+        "place_id": f"bench-place-{_seed(key) % 10000}-{i}",
+        "name": f"Bench Venue {i}",
+        "vicinity": f"{100 + i} Main St, Cambridge",
+        "geometry": {"location": {"lat": lat, "lng": lng}},
+        "price_level": rng.randint(0, 3),
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "user_ratings_total": rng.randint(5, 2000),
+        "types": [rng.choice(["bar", "park", "museum", "cafe", "night_club"]), "point_of_interest"],
+        "business_status": "OPERATIONAL",
+    }
+
+
+def _event(i: int, key: str, start: datetime) -> Dict[str, Any]:
+    lat, lng = _point("event", key, i)
+    rng = random.Random(_seed("event-meta", key, i))
+    begins = start + timedelta(minutes=15 * (i % 12))
+    category = rng.choice(["Music", "Arts", "Food & Drink", "Community"])
+    return {
+        "id": f"bench-event-{_seed(key) % 10000}-{i}",
+        "name": {"text": f"Bench Event {i}"},
+        "summary": f"A {category.lower()} event for benchmarking.",
+        "url": f"https://example.invalid/events/{i}",
+        "is_free": rng.random() < 0.3,
+        "start": {"utc": begins.strftime("%Y-%m-%dT%H:%M:%SZ")},
+        "category": {"short_name": category},
+        "venue": {
+            "latitude": f"{lat:.6f}",
+            "longitude": f"{lng:.6f}",
+            "address": {"localized_address_display": f"{200 + i} Mass Ave, Cambridge"},
+        },
+    }
+
+
+def _profile(user_id: str) -> Dict[str, Any]:
+    rng = random.Random(_seed("profile", user_id))
+    return {
+        "id": user_id,
+        "display_name": f"Bench {user_id}",
+        "likes": rng.sample(["jazz", "hiking", "tacos", "museums", "trivia", "karaoke"], 2),
+        "vibes": rng.sample(_VIBES, 2),
+        "tags": rng.sample(["outdoors", "live music", "cheap", "late night"], 2),
+        "budget_max": rng.choice([15, 25, 40, None]),
+        "distance_km_max": rng.choice([3, 5, 10, None]),
+        "updated_at": "2024-01-01T00:00:00Z",
+    }
+
+
+def _controller_reply(state: Dict[str, Any], plan_mode: bool) -> Dict[str, Any]:
+    if plan_mode:
+        if "merged" in state:
+            steps = [("find_activities", []), ("finalize", ["s1"])]
+        else:
+            steps = [("get_tastes", []), ("merge_tastes", ["s1"]), ("find_activities", ["s2"]), ("finalize", ["s3"])]
+        return {
+            "plan": [
+                {"id": f"s{i}", "action": action, "args": {}, "after": after}
+                for i, (action, after) in enumerate(steps, 1)
+            ],
+            "rationale": "benchmark plan",
+        }
+    observations = " ".join(str(o) for o in state.get("new_observations") or [])
+    if "group" not in state:
+        action = "get_tastes"
+    elif "merged" not in state:
+        action = "merge_tastes"
+    elif not state.get("candidates") and "Found" not in observations:
+        action = "find_activities"
+    else:
+        action = "finalize"
+    return {"action": action, "args": {}, "rationale": "benchmark step"}
+
+
+def _gemini_reply(message: str) -> Dict[str, Any]:
+    if "mood descriptions" in message:
+        rng = random.Random(_seed(message))
+        return {
+            "primary_vibes": rng.sample(_VIBES, 2),
+            "budget_hint": rng.choice(["free", "<20", "20-50"]),
+            "indoor_outdoor": "either",
+            "energy_level": rng.choice(["low", "medium", "high"]),
+            "time_hint": "today after 5pm",
+        }
+    # Controller prompts carry the encoded state between these markers.
+    body = message.split("User request:\n", 1)[-1].rsplit("\n\nRespond with", 1)[0]
+    try:
+        state = json.loads(body)
+    except ValueError:
+        state = {}
+    return _controller_reply(state, plan_mode="WHOLE remaining plan" in message)
+
+
+def build_standin(profile: StandinProfile) -> FastAPI:
+    """The upstream stand-in app: one server answering for every provider."""
+    app = FastAPI(title="Vivi benchmark upstreams")
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next: Any) -> Any:
+        base = profile.llm_latency_ms if request.url.path.startswith("/v1beta/") else profile.latency_ms
+        delay = base * random.uniform(1 - profile.jitter, 1 + profile.jitter) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < profile.error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return await call_next(request)
+
+    @app.get("/maps/api/geocode/json")
+    async def geocode(address: str = "") -> Dict[str, Any]:
+        lat, lng = _point("geocode", address.lower())
+        return {"status": "OK", "results": [{"geometry": {"location": {"lat": lat, "lng": lng}}}]}
+
+    def places_page(key: str, pagetoken: Optional[str]) -> Dict[str, Any]:
+        page = int(pagetoken.rsplit("-", 1)[-1]) if pagetoken else 0
+        start = page * profile.places_results
+        data: Dict[str, Any] = {
+            "status": "OK" if profile.places_results else "ZERO_RESULTS",
+            "results": [_place(i, key) for i in range(start, start + profile.places_results)],
+        }
+        if page + 1 < profile.places_pages:
+            data["next_page_token"] = f"{key}-{page + 1}"
+        return data
+
+    @app.get("/maps/api/place/nearbysearch/json")
+    async def nearbysearch(location: str = "", keyword: str = "", pagetoken: Optional[str] = None) -> Dict[str, Any]:
+        return places_page(pagetoken.rsplit("-", 1)[0] if pagetoken else f"{location}:{keyword}", pagetoken)
+
+    @app.get("/maps/api/place/textsearch/json")
+    async def textsearch(query: str = "", pagetoken: Optional[str] = None) -> Dict[str, Any]:
+        return places_page(pagetoken.rsplit("-", 1)[0] if pagetoken else query, pagetoken)
+
+    @app.get("/v3/events/search/")
+    async def eventbrite(request: Request) -> Dict[str, Any]:
+        params = request.query_params
+        page = int(params.get("page") or 1)
+        try:
+            start = datetime.strptime(params.get("start_date.range_start", "")[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            start = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=2)
+        key = params.get("q", "")
+        first = (page - 1) * profile.eventbrite_results
+        return {
+            "pagination": {
+                "page_number": page,
+                "page_count": profile.eventbrite_pages,
+                "has_more_items": page < profile.eventbrite_pages,
+            },
+            "events": [_event(i, key, start) for i in range(first, first + profile.eventbrite_results)],
+        }
+
+    @app.get("/rest/v1/profiles")
+    async def profiles(request: Request) -> Any:
+        ids = request.query_params.get("id", "")
+        if ids.startswith("eq."):
+            row = _profile(ids[3:])
+            # ``.single()`` asks for an object rather than a one-row array.
+            single = "vnd.pgrst.object" in request.headers.get("accept", "")
+            return row if single else [row]
+        if ids.startswith("in.("):
+            return [_profile(uid.strip('"')) for uid in ids[4:-1].split(",") if uid]
+        return []
+
+    @app.post("/v1beta/models/{model_call:path}")
+    async def generate_content(model_call: str, request: Request) -> Dict[str, Any]:
+        payload = await request.json()
+        parts = (payload.get("contents") or [{}])[0].get("parts") or []
+        message = "".join(part.get("text") or "" for part in parts)
+        reply = json.dumps(_gemini_reply(message), separators=(",", ":"))
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": reply}]}}]}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _ThreadedServer:
+    """Runs a uvicorn server on a background thread."""
+
+    def __init__(self, app: FastAPI, port: int) -> None:
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "_ThreadedServer":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Stand-in server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def _app_env(mode: str, upstream: str, cache_dir: str, no_cache: bool, rate_limits: str = "off") -> Dict[str, str]:
+    env = dict(os.environ)
+    if rate_limits == "off":
+        # Don't let limits exported in the shell throttle the run.
+        for key in [k for k in env if k.startswith("RESILIENCE_") and k.endswith("_RPS")]:
+            del env[key]
+    env.update(
+        {
+            "GOOGLE_MAPS_API_BASE": upstream,
+            "EVENTBRITE_API_BASE": upstream,
+            "GEMINI_API_BASE": upstream,
+            "SUPABASE_URL": upstream,
+            "SUPABASE_SERVICE_ROLE_KEY": _FAKE_SUPABASE_KEY,
+            "GOOGLE_PLACES_API_KEY": "benchmark",
+            "GOOGLE_MAPS_API_KEY": "benchmark",
+            "EVENTBRITE_API_KEY": "benchmark",
+            "GEMINI_API_KEY": "benchmark",
+            "CACHE_DB_PATH": os.path.join(cache_dir, f"{mode}.sqlite3"),
+            "USE_AGENTIC": "1" if mode == "agentic" else "0",
+        }
+    )
+    if no_cache:
+        env["PROVIDER_CACHE_ENABLED"] = "0"
+        env["LLM_CACHE_SYSTEMS"] = ""
+    return env
+
+
+def _start_app(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API process exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("API process did not become healthy within 30s")
+
+
+def _request_body(i: int, distinct: int, group_size: int) -> Dict[str, Any]:
+    # ``distinct`` bodies repeat round-robin, which sets how often caches can hit.
+    n = i % distinct if distinct > 0 else i
+    return {
+        "query_text": f"{_QUERIES[n % len(_QUERIES)]} #{n}",
+        "user_ids": [f"bench-user-{(n + k) % 97}" for k in range(group_size)],
+        "location_hint": _LOCATIONS[n % len(_LOCATIONS)],
+        "time_window": "today 5pm-9pm",
+        "vibe_hint": _VIBES[n % len(_VIBES)],
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def _drive(base_url: str, total: int, concurrency: int, offset: int, args: argparse.Namespace) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for i in counter:
+                body = _request_body(offset + i, args.distinct, args.group_size)
+                started = time.perf_counter()
+                try:
+                    resp = await client.post("/api/v1/plan", json=body)
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "mean_ms": round(sum(ms) / len(ms), 1) if ms else 0.0,
+        "max_ms": round(ms[-1], 1) if ms else 0.0,
+    }
+
+
+def run_mode(mode: str, upstream: str, cache_dir: str, args: argparse.Namespace) -> Dict[str, Any]:
+    port = _free_port()
+    proc = _start_app(port, _app_env(mode, upstream, cache_dir, args.no_cache, args.rate_limits))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if args.warmup:
+            asyncio.run(_drive(base_url, args.warmup, min(args.concurrency, args.warmup), 0, args))
+        result = asyncio.run(_drive(base_url, args.requests, args.concurrency, args.warmup, args))
+        result["mode"] = mode
+        result["resilience"] = _resilience_counters(base_url)
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _resilience_counters(base_url: str) -> Dict[str, Any]:
+    """Per-upstream breaker state and counters from the app's stats endpoint."""
+    try:
+        return httpx.get(f"{base_url}/api/v1/stats", timeout=5).json().get("resilience") or {}
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.warning("Could not read resilience stats: %s", exc)
+        return {}
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Human-readable regressions of ``results`` against ``baseline``."""
+    problems: List[str] = []
+    for mode, current in results.items():
+        before = baseline.get(mode)
+        if not before:
+            continue
+        if before.get("p95_ms") and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"{mode}: p95 {current['p95_ms']} ms vs baseline {before['p95_ms']} ms")
+        if before.get("rps") and current["rps"] < before["rps"] * (1 - tolerance):
+            problems.append(f"{mode}: {current['rps']} req/s vs baseline {before['rps']} req/s")
+    return problems
+
+
+def _print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    columns = ("mode", "requests", "errors", "concurrency", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print("  ".join(f"{c:>11}" for c in columns))
+    for result in results.values():
+        print("  ".join(f"{result[c]!s:>11}" for c in columns))
+
+    columns = ("calls", "retries", "failures", "rejected", "shed", "throttled_s", "state")
+    rows = [(result["mode"], upstream, counters)
+            for result in results.values() for upstream, counters in sorted(result.get("resilience", {}).items())]
+    if rows:
+        print()
+        print("  ".join(f"{c:>13}" for c in ("mode", "upstream") + columns))
+        for mode, upstream, counters in rows:
+            print("  ".join(f"{v!s:>13}" for v in (mode, upstream) + tuple(counters.get(c, "") for c in columns)))
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated: pipeline, agentic")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests sent first")
+    parser.add_argument("--distinct", type=int, default=0, help="distinct request bodies (0 = all unique)")
+    parser.add_argument("--group-size", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request (s)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the provider and LLM response caches")
+    parser.add_argument(
+        "--rate-limits", choices=("off", "default"), default="off",
+        help="off: ignore RESILIENCE_*_RPS from the environment; default: keep them",
+    )
+    defaults = StandinProfile()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="stand-in HTTP latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms, help="stand-in Gemini latency")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="fraction of upstream 503s")
+    parser.add_argument("--places-results", type=int, default=defaults.places_results)
+    parser.add_argument("--places-pages", type=int, default=defaults.places_pages)
+    parser.add_argument("--eventbrite-results", type=int, default=defaults.eventbrite_results)
+    parser.add_argument("--eventbrite-pages", type=int, default=defaults.eventbrite_pages)
+    parser.add_argument("--json-out", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/rps change vs baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        print(f"Unknown mode(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    profile = StandinProfile(
+        latency_ms=args.latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        places_results=args.places_results,
+        places_pages=args.places_pages,
+        eventbrite_results=args.eventbrite_results,
+        eventbrite_pages=args.eventbrite_pages,
+    )
+    standin_port = _free_port()
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="vivi-bench-") as cache_dir, _ThreadedServer(
+        build_standin(profile), standin_port
+    ):
+        upstream = f"http://127.0.0.1:{standin_port}"
+        for mode in modes:
+            print(f"Running {mode}: {args.requests} requests at concurrency {args.concurrency}...", file=sys.stderr)
+            results[mode] = run_mode(mode, upstream, cache_dir, args)
+
+    _print_table(results)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump({"profile": asdict(profile), "results": results}, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh).get("results") or {}
+        problems = compare(results, baseline, args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Small caching primitives shared by the tool layer.
+
+``TTLCache`` is an in-memory LRU with per-entry expiry that can optionally be
+backed by a SQLite file so entries survive process restarts. Values must be
+JSON-serialisable when persistence is enabled.
+
+Lookups are always served from memory. A persistent cache loads its live
+rows from SQLite once, on first use or from ``load_persistent_caches`` at
+startup. Writes go to the file through a background thread, so no request
+waits on SQLite I/O.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MISS = object()
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(".cache", "vivi-cache.sqlite3"))
+# How often a store sweeps out expired rows (also done once when the file is opened).
+CACHE_PRUNE_INTERVAL_S = float(os.getenv("CACHE_PRUNE_INTERVAL_S", "3600"))
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Lower-case and collapse punctuation/whitespace: "Cambridge, MA" -> "cambridge ma"."""
+    if not text:
+        return ""
+    return _NON_ALNUM.sub(" ", str(text).lower()).strip()
+
+
+class _SQLiteStore:
+    """One cache file. Reads happen when a cache loads; writes are queued for the writer thread."""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._writes: "queue.Queue[Tuple[str, Tuple[Any, ...]]]" = queue.Queue()
+        self._next_prune = 0.0
+        self.prune()
+        threading.Thread(target=self._run, name="cache-writer", daemon=True).start()
+
+    def load(self, namespace: str, limit: int) -> List[Tuple[str, Any, float]]:
+        """Up to ``limit`` live ``(key, value, expires_at)`` rows, longest-lived first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM cache_entries WHERE namespace = ? AND expires_at > ?"
+                " ORDER BY expires_at DESC LIMIT ?",
+                (namespace, time.time(), limit),
+            ).fetchall()
+        loaded: List[Tuple[str, Any, float]] = []
+        for key, value, expires_at in rows:
+            try:
+                loaded.append((key, json.loads(value), expires_at))
+            except ValueError:
+                logger.warning("Skipping unreadable cache row %s/%s", namespace, key)
+        return loaded
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: float) -> None:
+        self._writes.put((
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), expires_at),
+        ))
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        if key is None:
+            self._writes.put(("DELETE FROM cache_entries WHERE namespace = ?", (namespace,)))
+        else:
+            self._writes.put(("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)))
+
+    def prune(self) -> int:
+        """Delete every expired row. Returns the number removed."""
+        now = time.time()
+        with self._lock:
+            self._next_prune = now + CACHE_PRUNE_INTERVAL_S
+            removed = self._conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,)).rowcount
+        if removed:
+            logger.info("Pruned %d expired cache rows", removed)
+        return removed
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (up to ``timeout``) for queued writes to reach the file."""
+        deadline = time.monotonic() + timeout
+        while self._writes.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self) -> None:
+        while True:
+            sql, params = self._writes.get()
+            try:
+                with self._lock:
+                    self._conn.execute(sql, params)
+                if time.time() >= self._next_prune:
+                    self.prune()
+            except Exception as exc:  # pylint: disable=broad-except
+                # Memory already has the change; the file catches up on the next write to this key.
+                logger.warning("Cache write failed: %s", exc)
+            finally:
+                self._writes.task_done()
+
+
+# path -> store, or None once opening it has failed (so it isn't retried on every call).
+_stores: Dict[str, Optional[_SQLiteStore]] = {}
+_stores_lock = threading.Lock()
+_persistent: List["TTLCache"] = []
+
+
+def _get_store(path: str) -> Optional[_SQLiteStore]:
+    with _stores_lock:
+        if path not in _stores:
+            try:
+                _stores[path] = _SQLiteStore(path)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Cache store %s unavailable, using memory only: %s", path, exc)
+                _stores[path] = None
+        return _stores[path]
+
+
+def load_persistent_caches() -> None:
+    """Load every persistent cache from disk; run off the event loop at startup."""
+    for cache in list(_persistent):
+        cache.load()
+
+
+def flush_persistent_caches(timeout: float = 5.0) -> None:
+    for store in list(_stores.values()):
+        if store is not None:
+            store.flush(timeout)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs and optional SQLite write-behind."""
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        persist: bool = False,
+        path: Optional[str] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        db_path = path if path is not None else CACHE_DB_PATH
+        # Opened on first use, so importing a module that declares a cache touches no files.
+        self._db_path = db_path if persist and db_path else None
+        self._loaded = self._db_path is None
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self._db_path:
+            _persistent.append(self)
+
+    def load(self) -> None:
+        """Pull live rows from the file into memory; a no-op after the first call."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            store = self._store()
+            rows: List[Tuple[str, Any, float]] = []
+            if store is not None:
+                try:
+                    rows = store.load(self.namespace, self.maxsize)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning("Cache load failed for %s: %s", self.namespace, exc)
+            with self._lock:
+                # Oldest first, so the longest-lived rows end up most recently used.
+                for key, value, expires_at in reversed(rows):
+                    if key not in self._entries:
+                        self._insert(key, value, expires_at)
+            self._loaded = True
+
+    def get(self, key: str, default: Any = MISS) -> Any:
+        self.load()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.load()
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._insert(key, value, expires_at)
+        store = self._store()
+        if store is not None:
+            try:
+                store.set(self.namespace, key, value, expires_at)
+            except (TypeError, ValueError) as exc:
+                logger.warning("Cache value for %s is not JSON-serialisable: %s", self.namespace, exc)
+
+    def delete(self, key: str) -> None:
+        self.load()
+        with self._lock:
+            self._entries.pop(key, None)
+        store = self._store()
+        if store is not None:
+            store.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        self.load()
+        with self._lock:
+            self._entries.clear()
+        store = self._store()
+        if store is not None:
+            store.delete(self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "persistent": self._db_path is not None and _stores.get(self._db_path) is not None,
+            }
+
+    def _store(self) -> Optional[_SQLiteStore]:
+        return _get_store(self._db_path) if self._db_path else None
+
+    def _insert(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,177 @@
+"""
+Compact JSON encoding of the agentic controller's state for LLM prompts.
+
+Instead of ``str()`` of full ``UserTaste`` dumps and the whole observation
+history, the controller sends a deduplicated group summary, the key merged
+constraints, and only observations added since its previous call, all kept
+under a token budget. Reducers trim lists, older observations and details
+first; long strings are then clipped, so any budget of a few dozen tokens or
+more is a hard limit. A smaller one logs a warning.
+"""
+
+import json
+import logging
+import math
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTROLLER_TOKEN_BUDGET = int(os.getenv("CONTROLLER_TOKEN_BUDGET", "600"))
+
+_OBS_CURSOR = "_observations_sent"
+_MERGED_KEYS = ("vibe", "energy_level", "budget_cap", "distance_cap", "location", "time_window", "likes", "tags")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English + JSON.
+    return math.ceil(len(text) / 4)
+
+
+def _top(counter: Counter, limit: int) -> List[str]:
+    return [item for item, _ in counter.most_common(limit)]
+
+
+def _group_summary(tastes: List[Any], limit: int) -> Optional[Dict[str, Any]]:
+    if not tastes:
+        return None
+    vibes: Counter = Counter()
+    likes: Counter = Counter()
+    tags: Counter = Counter()
+    budgets: List[float] = []
+    distances: List[float] = []
+    for taste in tastes:
+        vibes.update(dict.fromkeys(taste.vibes, 1))
+        likes.update(dict.fromkeys(taste.likes, 1))
+        tags.update(dict.fromkeys(taste.tags, 1))
+        if taste.budget_max is not None:
+            budgets.append(taste.budget_max)
+        if taste.distance_km_max is not None:
+            distances.append(taste.distance_km_max)
+    summary: Dict[str, Any] = {
+        "size": len(tastes),
+        "vibes": dict(vibes.most_common(limit)),
+        "likes": _top(likes, limit),
+        "tags": _top(tags, limit),
+    }
+    if budgets:
+        summary["budget_max"] = min(budgets)
+    if distances:
+        summary["distance_km_max"] = min(distances)
+    return summary
+
+
+def _merged_summary(merged: Optional[Dict[str, Any]], limit: int) -> Optional[Dict[str, Any]]:
+    if not merged:
+        return None
+    out: Dict[str, Any] = {}
+    for key in _MERGED_KEYS:
+        value = merged.get(key)
+        if isinstance(value, list):
+            value = value[:limit]
+        if value in (None, "", []):
+            continue
+        out[key] = value
+    return out
+
+
+def encode_state(
+    state: Dict[str, Any],
+    extra: Optional[Dict[str, Any]] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Serialise ``state`` to compact JSON under ``token_budget`` and advance the
+    observation cursor, so the next call only carries newer observations.
+    """
+    budget = token_budget or CONTROLLER_TOKEN_BUDGET
+    observations = state.get("observations") or []
+    cursor = state.get(_OBS_CURSOR, 0)
+    new_observations = list(observations[cursor:])
+
+    list_limit = 8
+    query = str(state.get("query") or "")
+    details = True
+    text_limit: Optional[int] = None
+
+    def clip(value: Any) -> Any:
+        if text_limit is None or not isinstance(value, str) or len(value) <= text_limit + 1:
+            return value
+        return value[:text_limit] + "…"
+
+    def build() -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"query": clip(query)}
+        listener = {k: v for k, v in (state.get("listener") or {}).items() if v not in (None, "", [])}
+        if listener and details:
+            payload["listener"] = listener
+        group = _group_summary(state.get("tastes") or [], list_limit)
+        if group:
+            payload["group"] = group if details else {"size": group["size"]}
+        merged = _merged_summary(state.get("merged"), list_limit)
+        if merged:
+            payload["merged"] = {key: clip(value) for key, value in merged.items()}
+        payload["candidates"] = len(state.get("raw_candidates") or [])
+        if new_observations:
+            payload["new_observations"] = [clip(obs) for obs in new_observations]
+        if extra:
+            payload.update({key: clip(value) for key, value in extra.items()})
+        return payload
+
+    def shrink_lists() -> bool:
+        nonlocal list_limit
+        if list_limit <= 2:
+            return False
+        list_limit //= 2
+        return True
+
+    def shrink_observations() -> bool:
+        if len(new_observations) <= 1:
+            return False
+        del new_observations[0]
+        return True
+
+    def shrink_query() -> bool:
+        nonlocal query
+        if len(query) <= 121:
+            return False
+        query = query[:120] + "…"
+        return True
+
+    def drop_details() -> bool:
+        nonlocal details
+        if not details:
+            return False
+        details = False
+        return True
+
+    def clip_text() -> bool:
+        nonlocal text_limit
+        if text_limit is not None and text_limit <= 16:
+            return False
+        text_limit = 120 if text_limit is None else text_limit // 2
+        return True
+
+    def drop_lists() -> bool:
+        nonlocal list_limit
+        if list_limit == 0:
+            return False
+        list_limit = 0
+        return True
+
+    reducers: List[Callable[[], bool]] = [
+        shrink_lists, shrink_observations, shrink_query, drop_details, clip_text, drop_lists,
+    ]
+    text = json.dumps(build(), separators=(",", ":"), ensure_ascii=False, default=str)
+    for reducer in reducers:
+        while estimate_tokens(text) > budget and reducer():
+            text = json.dumps(build(), separators=(",", ":"), ensure_ascii=False, default=str)
+    if estimate_tokens(text) > budget:
+        logger.warning("Controller prompt is ~%d tokens, over its budget of %d", estimate_tokens(text), budget)
+
+    state[_OBS_CURSOR] = len(observations)
+    logger.info(
+        "Controller prompt: %d chars (~%d tokens, budget %d), %d new observations",
+        len(text), estimate_tokens(text), budget, len(new_observations),
+    )
+    return text
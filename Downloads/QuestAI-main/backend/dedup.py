@@ -0,0 +1,144 @@
+"""
+Cross-provider deduplication of raw candidates.
+
+Two candidates are the same activity when they share a provider id
+(``place_id`` / event id), or when they sit in the same or an adjacent
+geohash cell and their title fingerprints overlap enough ("Lamplighter
+Brewing Co." vs "Lamplighter Brewing"). Candidates are bucketed by
+(cell, title token), so each one is compared only against the few
+neighbours sharing a bucket and the whole pass stays linear in the pool size.
+The searched location's own words ("Cambridge", "MA") are ignored in titles,
+since one provider may append the city and another not.
+"""
+
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .geo import geohash_cell, neighbour_cells
+
+DEDUP_GEOHASH_PRECISION = 7
+DEDUP_MIN_OVERLAP = 0.6
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Words that differ between providers' names for the same place.
+_NOISE = {
+    "the", "a", "an", "and", "at", "of", "in", "on",
+    "co", "company", "inc", "llc", "ltd", "restaurant", "bar", "cafe",
+}
+
+
+def noise_tokens(location: Optional[str] = None) -> FrozenSet[str]:
+    """Tokens dropped from title fingerprints: ``_NOISE`` plus the words of ``location``."""
+    return frozenset(_NOISE).union(_TOKEN.findall(str(location or "").lower()))
+
+
+def title_fingerprint(title: Any, noise: Optional[FrozenSet[str]] = None) -> FrozenSet[str]:
+    tokens = _TOKEN.findall(str(title or "").lower().replace("&", " and "))
+    noise = _NOISE if noise is None else noise
+    distinctive = frozenset(t for t in tokens if t not in noise)
+    return distinctive or frozenset(tokens)
+
+
+def _overlap(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    # Share of the shorter title covered by the longer one.
+    return len(a & b) / min(len(a), len(b))
+
+
+def _coords(item: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = float(item["lat"]), float(item["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return lat, lng
+
+
+def _provider_id(item: Dict[str, Any]) -> Optional[str]:
+    ident = item.get("place_id") or item.get("id")
+    return f"{item.get('source')}:{ident}" if ident else None
+
+
+# Identity fields belong to the kept candidate's own provider.
+_IDENTITY_FIELDS = {"id", "place_id", "source"}
+
+
+def _merge_into(kept: Dict[str, Any], dup: Dict[str, Any]) -> None:
+    for key, value in dup.items():
+        if key in _IDENTITY_FIELDS:
+            continue
+        if kept.get(key) in (None, "", []) and value not in (None, "", []):
+            kept[key] = value
+    tags = list(kept.get("tags") or [])
+    tags.extend(t for t in dup.get("tags") or [] if t not in tags)
+    kept["tags"] = tags
+    source = dup.get("source")
+    if source and source != kept.get("source"):
+        sources = kept.setdefault("also_on", [])
+        if source not in sources:
+            sources.append(source)
+
+
+def _nearby_match(
+    by_cell: Dict[Tuple[Tuple[int, int], str], List[int]],
+    fingerprints: List[FrozenSet[str]],
+    coords: Tuple[float, float],
+    fingerprint: FrozenSet[str],
+) -> Optional[int]:
+    seen = set()
+    for cell in neighbour_cells(geohash_cell(coords[0], coords[1], DEDUP_GEOHASH_PRECISION)):
+        for token in fingerprint:
+            for index in by_cell.get((cell, token), ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                if _overlap(fingerprint, fingerprints[index]) >= DEDUP_MIN_OVERLAP:
+                    return index
+    return None
+
+
+def dedupe_candidates(candidates: List[Dict[str, Any]], location: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Collapse duplicates, keeping the first occurrence and filling its gaps
+    (coordinates, links, tags) from later copies. Order is preserved.
+    ``location`` is the searched location, whose words don't count as title tokens.
+    """
+    noise = noise_tokens(location)
+    kept: List[Dict[str, Any]] = []
+    fingerprints: List[FrozenSet[str]] = []
+    by_id: Dict[str, int] = {}
+    # (geohash cell, title token) -> indexes into kept
+    by_cell: Dict[Tuple[Tuple[int, int], str], List[int]] = {}
+    # Candidates without coordinates fall back to (address, fingerprint).
+    by_address: Dict[Tuple[str, FrozenSet[str]], int] = {}
+
+    for item in candidates:
+        ident = _provider_id(item)
+        fingerprint = title_fingerprint(item.get("title"), noise)
+        coords = _coords(item)
+
+        match: Optional[int] = by_id.get(ident) if ident else None
+        if match is None and coords is not None:
+            match = _nearby_match(by_cell, fingerprints, coords, fingerprint)
+        address_key = (str(item.get("address") or "").lower().strip(), fingerprint)
+        if match is None and coords is None:
+            match = by_address.get(address_key)
+
+        if match is not None:
+            _merge_into(kept[match], item)
+            if ident:
+                by_id.setdefault(ident, match)
+            continue
+
+        index = len(kept)
+        kept.append(item)
+        fingerprints.append(fingerprint)
+        if ident:
+            by_id[ident] = index
+        if coords is not None:
+            cell = geohash_cell(coords[0], coords[1], DEDUP_GEOHASH_PRECISION)
+            for token in fingerprint:
+                by_cell.setdefault((cell, token), []).append(index)
+        else:
+            by_address[address_key] = index
+    return kept
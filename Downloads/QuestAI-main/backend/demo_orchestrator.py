@@ -1,3 +1,5 @@
+import asyncio
+
 # Dual-mode import shim: works as module (-m backend.demo_orchestrator)
 # and as a direct script (python backend/demo_orchestrator.py)
 if __package__ is None or __package__ == "":
@@ -19,7 +21,7 @@ def _run():
         custom_likes=["jazz picnic"],
         vibe_hint="music",
     )
-    resp = plan(req)
+    resp = asyncio.run(plan(req))
     print("ACTION LOG:", " | ".join(resp.action_log))
     for i, c in enumerate(resp.candidates, 1):
         print(f"\n#{i} {c.title} ({c.vibe}) score={c.group_score:.2f}")
@@ -0,0 +1,121 @@
+"""
+Geo helpers for raw candidates.
+
+``apply_distances`` is the geo stage: batched haversine distances and radius
+filtering, run once over the merged provider pool before the writer scores
+anything. Geohash cells back the dedup buckets, and ``tile_circle`` lays
+out the cells for the Places grid search.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _coords(candidates: Sequence[Dict[str, Any]], field: str) -> np.ndarray:
+    def value(c: Dict[str, Any]) -> float:
+        # Eventbrite returns coordinates as strings.
+        try:
+            return float(c.get(field)) if c.get(field) is not None else np.nan
+        except (TypeError, ValueError):
+            return np.nan
+
+    return np.fromiter((value(c) for c in candidates), dtype=float, count=len(candidates))
+
+
+def haversine_km(origin: Tuple[float, float], lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from ``origin`` to each point; NaN where a coordinate is missing."""
+    lat0, lng0 = np.radians(origin[0]), np.radians(origin[1])
+    lat, lng = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lng - lng0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def apply_distances(
+    candidates: List[Dict[str, Any]],
+    origin: Optional[Tuple[float, float]],
+    distance_cap: Any = None,
+) -> List[Dict[str, Any]]:
+    """
+    Set ``distance_km`` on each candidate and drop those beyond
+    ``distance_cap``. Candidates without coordinates are kept as-is, and
+    nothing changes when the origin couldn't be geocoded.
+    """
+    if not candidates or origin is None:
+        return candidates
+
+    distances = haversine_km(origin, _coords(candidates, "lat"), _coords(candidates, "lng"))
+    known = ~np.isnan(distances)
+    keep = np.ones(len(candidates), dtype=bool)
+    try:
+        cap = float(distance_cap) if distance_cap is not None else None
+    except (TypeError, ValueError):
+        cap = None
+    if cap is not None and cap > 0:
+        keep &= ~known | (distances <= cap)
+
+    rounded = np.round(distances, 1)
+    kept: List[Dict[str, Any]] = []
+    for i in np.flatnonzero(keep):
+        candidate = candidates[i]
+        if known[i]:
+            candidate["distance_km"] = float(rounded[i])
+        kept.append(candidate)
+    return kept
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(lat degrees, lng degrees) spanned by one geohash cell at ``precision``."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cell(lat: float, lng: float, precision: int = 7) -> Tuple[int, int]:
+    """
+    (row, column) of the geohash cell containing the point. A geohash string
+    is just these two indexes bit-interleaved, so the integer pair names the
+    same cell while making neighbours a matter of +/-1. Precision 7 cells
+    are roughly 150 m across.
+    """
+    dlat, dlng = geohash_cell_size(precision)
+    return int((lat + 90.0) // dlat), int((lng + 180.0) // dlng)
+
+
+def neighbour_cells(cell: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """The cell itself plus its eight neighbours."""
+    row, col = cell
+    return [(row + dy, col + dx) for dy in (0, -1, 1) for dx in (0, -1, 1)]
+
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def tile_circle(
+    origin: Tuple[float, float], radius_km: float, max_side: int, cell_km: float
+) -> Tuple[List[Tuple[float, float]], float]:
+    """
+    Cover a circle of ``radius_km`` around ``origin`` with a square grid of
+    at most ``max_side`` x ``max_side`` cells roughly ``cell_km`` wide.
+    Returns the centres of cells that touch the circle, and the search
+    radius (km) that makes each centre's circle cover its whole square.
+    """
+    side = max(1, min(max_side, math.ceil(2 * radius_km / cell_km)))
+    spacing = 2 * radius_km / side
+    lat0, lng0 = origin
+    km_per_degree_lng = KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat0)), 1e-6)
+    half_diagonal = spacing * math.sqrt(2) / 2
+
+    centres: List[Tuple[float, float]] = []
+    for row in range(side):
+        for col in range(side):
+            dy = -radius_km + spacing * (row + 0.5)
+            dx = -radius_km + spacing * (col + 0.5)
+            # Skip corner cells lying wholly outside the circle.
+            if math.hypot(dx, dy) - half_diagonal > radius_km:
+                continue
+            centres.append((lat0 + dy / KM_PER_DEGREE_LAT, lng0 + dx / km_per_degree_lng))
+    return centres, half_diagonal
@@ -0,0 +1,174 @@
+"""
+Process-wide pooled HTTP client for outbound provider calls.
+
+Every tool shares one keep-alive ``httpx.AsyncClient`` instead of paying
+TCP+TLS setup per request. HTTP/2 is
+negotiated when the optional ``h2`` package is installed, and a per-host
+semaphore keeps any single upstream from monopolising the pool.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+
+try:
+    import h2  # type: ignore  # noqa: F401
+
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+except ImportError:
+    HTTP2_ENABLED = False
+
+
+class _HostStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+
+
+_stats: Dict[str, _HostStats] = defaultdict(_HostStats)
+_stats_lock = threading.Lock()
+
+
+def _track(host: str, delta: int, error: bool = False) -> None:
+    with _stats_lock:
+        entry = _stats[host]
+        entry.in_flight += delta
+        if delta > 0:
+            entry.requests += 1
+        if error:
+            entry.errors += 1
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+def _releaser(host: str, semaphore: asyncio.Semaphore) -> Callable[[], None]:
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            _track(host, -1)
+            semaphore.release()
+
+    return release
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Caps concurrent requests per upstream host on top of the shared pool. A
+    permit is held until the response body is closed, not just until headers
+    arrive, so the cap bounds open connections rather than request starts.
+    """
+
+    def __init__(self, inner: httpx.AsyncHTTPTransport, per_host: int) -> None:
+        self._inner = inner
+        self._per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self._per_host))
+        await semaphore.acquire()
+        _track(host, 1)
+        release = _releaser(host, semaphore)
+        try:
+            response = await self._inner.handle_async_request(request)
+        except asyncio.CancelledError:
+            release()
+            raise
+        except Exception:
+            _track(host, 0, error=True)
+            release()
+            raise
+        if response.is_closed:
+            # Already read in full (e.g. a mock transport); nothing left to hold the permit for.
+            release()
+        else:
+            response.stream = _ReleasingStream(response.stream, release)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+    )
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared async client bound to the running event loop. A client cannot be
+    reused across loops, so a new one is created if the loop has changed
+    (e.g. successive ``asyncio.run`` calls in scripts).
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_loop is not loop:
+        transport = _HostLimitedTransport(
+            httpx.AsyncHTTPTransport(http2=HTTP2_ENABLED, limits=_limits()),
+            HTTP_MAX_PER_HOST,
+        )
+        _async_client = httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT_S)
+        _async_loop = loop
+    return _async_client
+
+
+async def aclose_client() -> None:
+    """Close the shared client; called from the FastAPI shutdown hook."""
+    global _async_client, _async_loop
+    if _async_client is not None and _async_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_loop = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        hosts = {
+            host: {"requests": s.requests, "errors": s.errors, "in_flight": s.in_flight}
+            for host, s in _stats.items()
+        }
+    return {
+        "http2": HTTP2_ENABLED,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive": HTTP_MAX_KEEPALIVE,
+        "max_per_host": HTTP_MAX_PER_HOST,
+        "hosts": hosts,
+    }
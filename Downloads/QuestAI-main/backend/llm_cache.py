@@ -0,0 +1,98 @@
+"""
+Response cache in front of ``llm_json``.
+
+Keys are ``(model, system prompt, normalised user prompt)`` so "Something
+chill tonight!" and "something chill tonight" share an entry. Caching is
+opt-in per system prompt via ``LLM_CACHE_SYSTEMS`` (default: listener only),
+because controller decisions depend on live tool observations and must not
+be replayed.
+"""
+
+import copy
+import hashlib
+import os
+import re
+from typing import Any, Dict, Optional, Set
+
+from .cache import MISS, TTLCache
+from .prompts import (
+    SYSTEM_CONTROLLER,
+    SYSTEM_CONTROLLER_PLAN,
+    SYSTEM_LISTENER,
+    SYSTEM_PLANNER,
+    SYSTEM_WRITER,
+)
+
+SYSTEMS_BY_NAME: Dict[str, str] = {
+    "listener": SYSTEM_LISTENER,
+    "planner": SYSTEM_PLANNER,
+    "writer": SYSTEM_WRITER,
+    "controller": SYSTEM_CONTROLLER,
+    "controller_plan": SYSTEM_CONTROLLER_PLAN,
+}
+
+_enabled: Set[str] = {
+    name.strip().lower()
+    for name in os.getenv("LLM_CACHE_SYSTEMS", "listener").split(",")
+    if name.strip()
+}
+
+_cache = TTLCache(
+    "llm",
+    maxsize=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("LLM_CACHE_TTL_S", "900")),
+    persist=os.getenv("LLM_CACHE_PERSIST", "0") == "1",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def system_name(system: str) -> Optional[str]:
+    for name, text in SYSTEMS_BY_NAME.items():
+        if text == system:
+            return name
+    return None
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", prompt.lower()).strip().rstrip(".!?")
+
+
+def cache_key(system: str, prompt: str, model: str) -> str:
+    raw = "\x1f".join([model, system_name(system) or system, normalize_prompt(prompt)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_enabled(system: str) -> bool:
+    return system_name(system) in _enabled
+
+
+def set_enabled(name: str, enabled: bool) -> None:
+    """Toggle caching for one named system prompt (see ``SYSTEMS_BY_NAME``)."""
+    if name not in SYSTEMS_BY_NAME:
+        raise ValueError(f"Unknown system prompt {name!r}; expected one of {sorted(SYSTEMS_BY_NAME)}")
+    if enabled:
+        _enabled.add(name)
+    else:
+        _enabled.discard(name)
+
+
+def get(system: str, prompt: str, model: str) -> Optional[Dict[str, Any]]:
+    if not is_enabled(system):
+        return None
+    value = _cache.get(cache_key(system, prompt, model))
+    # Hand out a copy so callers can't mutate the cached response.
+    return copy.deepcopy(value) if value is not MISS else None
+
+
+def put(system: str, prompt: str, model: str, response: Dict[str, Any]) -> None:
+    if is_enabled(system) and response:
+        _cache.set(cache_key(system, prompt, model), copy.deepcopy(response))
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def stats() -> Dict[str, Any]:
+    return {**_cache.stats(), "systems": sorted(_enabled)}
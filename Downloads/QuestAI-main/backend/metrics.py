@@ -0,0 +1,138 @@
+"""
+Per-stage latency metrics in Prometheus text format.
+
+Hot-path stages (``tool_*`` functions, provider and upstream calls,
+``llm_json``, agent passes and agentic controller steps) are wrapped with
+``@timed`` or ``with stage(...)``. Each observation feeds a latency histogram
+and a call counter labelled by stage, served by ``GET /metrics``.
+
+Each stage is also a child span of the request's trace when it is sampled
+(see ``backend.tracing``); ``@timed`` records list results' length on it.
+
+When a request opts into debug timings (``start_timings``), the same
+observations are also collected per request so they can be appended to the
+``PlanResponse`` action log.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from . import tracing
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+# stage -> [per-bucket counts..., +Inf count], sum of seconds
+_histograms: Dict[str, Tuple[List[int], List[float]]] = {}
+_counters: Dict[Tuple[str, str], int] = {}
+
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def observe(stage_name: str, seconds: float, outcome: str = "ok") -> None:
+    with _lock:
+        counts, total = _histograms.setdefault(stage_name, ([0] * (len(BUCKETS) + 1), [0.0]))
+        counts[bisect_left(BUCKETS, seconds)] += 1
+        total[0] += seconds
+        _counters[(stage_name, outcome)] = _counters.get((stage_name, outcome), 0) + 1
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage_name, seconds))
+
+
+@contextmanager
+def stage(stage_name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with tracing.span(stage_name):
+            yield
+        outcome = "ok"
+    finally:
+        observe(stage_name, time.perf_counter() - started, outcome)
+
+
+def _count_results(result: Any) -> Any:
+    if isinstance(result, list):
+        tracing.set_attribute("result.count", len(result))
+    return result
+
+
+def timed(stage_name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator recording a sync or async function's duration under ``stage_name`` (default: its name)."""
+
+    def decorator(fn: F) -> F:
+        label = stage_name or fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with stage(label):
+                    return _count_results(await fn(*args, **kwargs))
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(label):
+                return _count_results(fn(*args, **kwargs))
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def start_timings() -> Tuple[List[Tuple[str, float]], Token]:
+    """Collect this request's stage timings (including those in tasks it spawns)."""
+    timings: List[Tuple[str, float]] = []
+    return timings, _request_timings.set(timings)
+
+
+def stop_timings(token: Token) -> None:
+    _request_timings.reset(token)
+
+
+def format_timings(timings: List[Tuple[str, float]]) -> List[str]:
+    return [f"Timing: {name} {seconds * 1000:.1f} ms" for name, seconds in timings]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP vivi_stage_duration_seconds Latency of planning stages and upstream calls.",
+        "# TYPE vivi_stage_duration_seconds histogram",
+    ]
+    with _lock:
+        histograms = {name: (list(counts), total[0]) for name, (counts, total) in _histograms.items()}
+        counters = dict(_counters)
+    for name in sorted(histograms):
+        counts, total = histograms[name]
+        label = _escape(name)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, counts):
+            cumulative += count
+            lines.append(f'vivi_stage_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'vivi_stage_duration_seconds_bucket{{stage="{label}",le="+Inf"}} {cumulative}')
+        lines.append(f'vivi_stage_duration_seconds_sum{{stage="{label}"}} {total:.6f}')
+        lines.append(f'vivi_stage_duration_seconds_count{{stage="{label}"}} {cumulative}')
+    lines += [
+        "# HELP vivi_stage_calls_total Planning stage and upstream calls by outcome.",
+        "# TYPE vivi_stage_calls_total counter",
+    ]
+    for (name, outcome), count in sorted(counters.items()):
+        lines.append(f'vivi_stage_calls_total{{stage="{_escape(name)}",outcome="{outcome}"}} {count}')
+    return "\n".join(lines) + "\n"
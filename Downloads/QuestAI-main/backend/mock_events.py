@@ -0,0 +1,517 @@
+"""
+In-memory activity catalog standing in for Eventbrite + Google Places.
+
+Backs ``GET /api/v1/events`` (``search_mock_events``) and the provider
+fallback used when no API keys are configured (``get_tool_candidates``).
+
+Items are indexed once when the catalog is built:
+
+* an inverted index from title/summary/venue/tag tokens to item ids,
+* a location index over venue/address/city/region tokens,
+* vibe, provider and price-band indexes,
+* a start-time order: ids are assigned by ascending ``start_time``, so a
+  time window is a contiguous id range.
+
+Frequent terms are kept as integer bitmaps (bit ``i`` set = item ``i``);
+rare ones as id arrays that are turned into bitmaps on demand. Queries are
+then a handful of big-int ``&``/``|`` operations regardless of catalog size.
+Set ``MOCK_EVENTS_PATH`` to a JSON file (list of ``EventItem`` dicts) to
+serve a different catalog. The built-in catalog schedules its events
+relative to today, so it is rebuilt when the date changes.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .pricing import PRICE_BANDS, budget_cap_to_price_level
+
+logger = logging.getLogger(__name__)
+
+MOCK_EVENTS_PATH = os.getenv("MOCK_EVENTS_PATH")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "at", "by", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+# (title, summary, source, venue, address, city, vibes, tags, price, lat, lng, schedule)
+# schedule is (days from today, start hour, duration hours) for events, None for places.
+_SEED: List[Tuple[Any, ...]] = [
+    ("Jazz Night at Wally's", "Live jazz jam sessions in one of Boston's oldest jazz clubs.", "eventbrite",
+     "Wally's Cafe", "427 Massachusetts Ave", "Boston", ["music", "lively"], ["live music", "jazz", "bar"],
+     "$", 42.3434, -71.0857, (0, 21, 3)),
+    ("Sunset Kayak on the Charles", "Guided evening paddle past the Esplanade with skyline views.", "eventbrite",
+     "Charles River Canoe & Kayak", "1071 Soldiers Field Rd", "Boston", ["outdoors", "active"],
+     ["sunset", "kayak", "water"], "$$", 42.3601, -71.1243, (0, 18, 2)),
+    ("Harvard Square Open Mic", "Singer-songwriters and poets take the stage; sign-ups at the door.", "eventbrite",
+     "Club Passim", "47 Palmer St", "Cambridge", ["music", "cozy"], ["live music", "open mic", "acoustic"],
+     "$", 42.3735, -71.1190, (0, 19, 3)),
+    ("Trivia Tuesday", "Team pub trivia with prizes for the top three teams.", "eventbrite",
+     "The Burren", "247 Elm St", "Somerville", ["social", "lively"], ["trivia", "bar", "games"],
+     "free", 42.3959, -71.1218, (1, 20, 2)),
+    ("SoWa Open Market", "Local artists, vintage vendors and food trucks in the South End.", "eventbrite",
+     "SoWa Open Market", "460 Harrison Ave", "Boston", ["outdoors", "social"], ["market", "food trucks", "art"],
+     "free", 42.3418, -71.0662, (2, 10, 6)),
+    ("Salsa Social", "Beginner lesson followed by an open salsa dance floor.", "eventbrite",
+     "Havana Club", "288 Green St", "Cambridge", ["lively", "active"], ["dance", "salsa", "lesson"],
+     "$$", 42.3629, -71.1003, (1, 21, 3)),
+    ("Comedy Underground", "Stand-up showcase with Boston's up-and-coming comics.", "eventbrite",
+     "Comedy Studio", "5 John F Kennedy St", "Cambridge", ["lively", "social"], ["comedy", "stand-up", "show"],
+     "$$", 42.3727, -71.1196, (0, 20, 2)),
+    ("MFA Late Nights", "After-hours gallery access with a DJ and cash bar.", "eventbrite",
+     "Museum of Fine Arts", "465 Huntington Ave", "Boston", ["artsy", "chill"], ["museum", "art", "dj"],
+     "$$", 42.3394, -71.0940, (3, 18, 4)),
+    ("Arnold Arboretum Walking Tour", "Free docent-led walk through the lilac collection.", "eventbrite",
+     "Arnold Arboretum", "125 Arborway", "Boston", ["outdoors", "chill"], ["walk", "nature", "tour"],
+     "free", 42.3078, -71.1207, (2, 11, 2)),
+    ("Board Game Night", "Hundreds of games to borrow; snacks and drinks available.", "eventbrite",
+     "Knight Moves Cafe", "1402 Beacon St", "Brookline", ["cozy", "social"], ["board games", "games", "cafe"],
+     "$", 42.3438, -71.1360, (1, 18, 4)),
+    ("Rooftop Yoga at Sunrise", "All-levels vinyasa flow above the Seaport.", "eventbrite",
+     "Envoy Hotel Rooftop", "70 Sleeper St", "Boston", ["active", "chill"], ["yoga", "sunrise", "wellness"],
+     "$$", 42.3529, -71.0488, (1, 7, 1)),
+    ("Indie Rock at the Sinclair", "Three local indie bands on one bill.", "eventbrite",
+     "The Sinclair", "52 Church St", "Cambridge", ["music", "lively"], ["live music", "concert", "indie"],
+     "$$", 42.3745, -71.1205, (2, 20, 3)),
+    ("Castle Island", "Harborside loop with Fort Independence and Sullivan's hot dogs.", "google_places",
+     "Castle Island", "2010 William J Day Blvd", "Boston", ["outdoors", "chill"], ["park", "sunset", "walk"],
+     "free", 42.3381, -71.0122, None),
+    ("Tatte Bakery & Cafe", "Airy bakery cafe known for shakshuka and pastries.", "google_places",
+     "Tatte Bakery & Cafe", "1288 Massachusetts Ave", "Cambridge", ["cozy", "chill"], ["cafe", "brunch", "coffee"],
+     "$", 42.3726, -71.1160, None),
+    ("Lucky Strike Boston", "Bowling, billiards and arcade games near Fenway.", "google_places",
+     "Lucky Strike", "145 Ipswich St", "Boston", ["lively", "social"], ["bowling", "games", "bar"],
+     "$$", 42.3472, -71.0938, None),
+    ("Brattle Theatre", "Repertory cinema screening classics and indie premieres.", "google_places",
+     "Brattle Theatre", "40 Brattle St", "Cambridge", ["cozy", "artsy"], ["movies", "cinema", "indie"],
+     "$", 42.3739, -71.1210, None),
+    ("Boston Public Garden", "Swan boats, lagoon bridge and shady lawns downtown.", "google_places",
+     "Boston Public Garden", "4 Charles St", "Boston", ["outdoors", "chill"], ["park", "walk", "picnic"],
+     "free", 42.3541, -71.0704, None),
+    ("Night Shift Brewing", "Taproom with rotating small-batch beers and food trucks.", "google_places",
+     "Night Shift Brewing", "1 Lincoln St", "Everett", ["social", "lively"], ["brewery", "beer", "food trucks"],
+     "$$", 42.4063, -71.0706, None),
+    ("Central Rock Gym", "Bouldering and top-rope climbing with day passes.", "google_places",
+     "Central Rock Gym", "486 Columbus Ave", "Boston", ["active"], ["climbing", "fitness", "indoor"],
+     "$$", 42.3427, -71.0818, None),
+    ("Oleana", "Eastern Mediterranean small plates with a garden patio.", "google_places",
+     "Oleana", "134 Hampshire St", "Cambridge", ["cozy", "romantic"], ["dinner", "restaurant", "patio"],
+     "$$$", 42.3705, -71.0966, None),
+    ("Davis Square Karaoke", "Private karaoke rooms booked by the hour.", "google_places",
+     "Limelight Stage + Studios", "204 Elm St", "Somerville", ["lively", "music"], ["karaoke", "singing", "bar"],
+     "$$", 42.3964, -71.1223, None),
+    ("Institute of Contemporary Art", "Waterfront contemporary art museum with harbor views.", "google_places",
+     "ICA Boston", "25 Harbor Shore Dr", "Boston", ["artsy", "chill"], ["museum", "art", "waterfront"],
+     "$$", 42.3529, -71.0430, None),
+    ("Harbor Islands Ferry", "Ferry to Spectacle and Georges Islands for hiking and beaches.", "google_places",
+     "Boston Harbor Islands", "191 W Atlantic Ave", "Boston", ["outdoors", "active"], ["ferry", "hike", "beach"],
+     "$$", 42.3599, -71.0500, None),
+    ("Lamplighter Brewing", "Cambridgeport brewery with board games and a cozy taproom.", "google_places",
+     "Lamplighter Brewing Co.", "284 Broadway", "Cambridge", ["cozy", "social"], ["brewery", "beer", "board games"],
+     "$", 42.3660, -71.0950, None),
+]
+
+Posting = Union[int, "array[int]"]
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=65536)
+def _text_tokens(text: str) -> Tuple[str, ...]:
+    # Venues, cities and tags repeat across items, so indexing mostly hits this cache.
+    return tuple(_stem(token) for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS)
+
+
+def tokenize(*texts: Optional[str]) -> List[str]:
+    tokens: List[str] = []
+    for text in texts:
+        if text:
+            tokens.extend(_text_tokens(str(text)))
+    return tokens
+
+
+def _key(value: Any) -> str:
+    return " ".join(tokenize(value))
+
+
+def _ids_to_bits(ids: Iterable[int], size: int) -> int:
+    buf = bytearray((size >> 3) + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _iter_bits(bits: int) -> Iterator[int]:
+    """Yield set bit positions from lowest to highest."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _TermIndex:
+    """Term -> item ids, as a bitmap for frequent terms and an id array for rare ones."""
+
+    def __init__(self) -> None:
+        self._building: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Posting] = {}
+        self._size = 0
+
+    def add(self, term: str, item_id: int) -> None:
+        if term:
+            ids = self._building.setdefault(term, [])
+            if not ids or ids[-1] != item_id:
+                ids.append(item_id)
+
+    def freeze(self, size: int) -> None:
+        self._size = size
+        # A bitmap costs size/8 bytes; below size/64 ids an array of 4-byte ids is smaller.
+        dense_at = max(size >> 6, 1)
+        for term, ids in self._building.items():
+            self._postings[term] = _ids_to_bits(ids, size) if len(ids) >= dense_at else array("I", ids)
+        self._building = {}
+
+    def bits(self, term: str) -> int:
+        posting = self._postings.get(term)
+        if posting is None:
+            return 0
+        if isinstance(posting, int):
+            return posting
+        return _ids_to_bits(posting, self._size)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._postings
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+
+class ActivityCatalog:
+    def __init__(self, items: List[Dict[str, Any]]) -> None:
+        # Start-time order: timed items first by start, untimed (venues) after.
+        def start_of(item: Dict[str, Any]) -> Tuple[int, float]:
+            ts = _timestamp(item.get("start_time"))
+            return (0, ts) if ts is not None else (1, 0.0)
+
+        ordered = sorted(items, key=start_of)
+        self.items: List[Dict[str, Any]] = ordered
+        self.size = len(ordered)
+        self.starts: List[float] = []
+        self.all_bits = (1 << self.size) - 1
+
+        self.text = _TermIndex()
+        self.location = _TermIndex()
+        self.vibes = _TermIndex()
+        self.sources = _TermIndex()
+        self.prices = _TermIndex()
+
+        for item_id, item in enumerate(ordered):
+            ts = _timestamp(item.get("start_time"))
+            if ts is not None:
+                self.starts.append(ts)
+            for token in tokenize(item.get("title"), item.get("summary"), item.get("venue"), *item.get("tags", [])):
+                self.text.add(token, item_id)
+            for token in tokenize(item.get("venue"), item.get("address"), item.get("city"), item.get("region")):
+                self.location.add(token, item_id)
+            for vibe in list(item.get("vibes") or []) + list(item.get("tags") or []):
+                self.vibes.add(_key(vibe), item_id)
+            self.sources.add(str(item.get("source") or ""), item_id)
+            self.prices.add(str(item.get("price") or ""), item_id)
+
+        for index in (self.text, self.location, self.vibes, self.sources, self.prices):
+            index.freeze(self.size)
+
+        timed = len(self.starts)
+        self.untimed_bits = self.all_bits ^ ((1 << timed) - 1)
+
+    # --- filters -------------------------------------------------------
+
+    def _all_terms(self, index: _TermIndex, tokens: List[str]) -> int:
+        bits = self.all_bits
+        for token in tokens:
+            bits &= index.bits(token)
+            if not bits:
+                break
+        return bits
+
+    def _time_bits(self, start: float, end: float) -> int:
+        lo = bisect_left(self.starts, start)
+        hi = bisect_left(self.starts, end)
+        return ((1 << hi) - 1) ^ ((1 << lo) - 1)
+
+    def _price_bits(self, budget_cap: Any) -> int:
+        # Same cutoffs as the live Places filter in tools.py.
+        cap_level = budget_cap_to_price_level(budget_cap)
+        if cap_level is None:
+            return self.all_bits
+        bits = 0
+        listed = 0
+        for level, band in enumerate(PRICE_BANDS):
+            if level <= cap_level:
+                bits |= self.prices.bits(band)
+            listed |= self.prices.bits(band)
+        # Items with no listed price aren't excluded.
+        return bits | (self.all_bits ^ listed)
+
+    def select(
+        self,
+        q: Optional[str] = None,
+        location: Optional[str] = None,
+        vibe: Optional[str] = None,
+        provider: Optional[str] = None,
+        time_window: Optional[str] = None,
+        budget_cap: Any = None,
+        strict_location: bool = True,
+    ) -> int:
+        """Bitmap of items passing every given filter."""
+        mask = self.all_bits
+        if provider:
+            mask &= self.sources.bits(provider)
+        if q and mask:
+            mask &= self._all_terms(self.text, tokenize(q))
+        if vibe and mask:
+            mask &= self.vibes.bits(_key(vibe))
+        if time_window and mask:
+            bounds = time_window_bounds(time_window)
+            if bounds:
+                mask &= self._time_bits(*bounds) | self.untimed_bits
+        if budget_cap is not None and mask:
+            mask &= self._price_bits(budget_cap)
+        if location and mask:
+            located = mask & self._all_terms(self.location, tokenize(location))
+            # The demo catalog only covers greater Boston; without a match the
+            # tool fallback keeps everything rather than returning nothing.
+            mask = located if (located or strict_location) else mask
+        return mask
+
+    def top(self, mask: int, boosts: List[str], limit: int) -> List[int]:
+        """
+        Up to ``limit`` ids from ``mask``, ranked by how many boost terms they
+        match (ties in start-time order).
+        """
+        terms: List[int] = []
+        for boost in dict.fromkeys(_key(b) for b in boosts if _key(b)):
+            tokens = boost.split()
+            bits = self._all_terms(self.text, tokens) | self.vibes.bits(boost)
+            if bits & mask:
+                terms.append(bits)
+
+        # at_least[k]: items in mask matching >= k boost terms.
+        at_least = [mask]
+        for bits in terms:
+            at_least.append(at_least[-1] & bits)
+            for k in range(len(at_least) - 2, 0, -1):
+                at_least[k] |= at_least[k - 1] & bits
+
+        picked: List[int] = []
+        taken = 0
+        for k in range(len(at_least) - 1, -1, -1):
+            tier = at_least[k] & ~taken
+            for item_id in _iter_bits(tier):
+                picked.append(item_id)
+                if len(picked) >= limit:
+                    return picked
+            taken |= tier
+        return picked
+
+    def item(self, item_id: int) -> Dict[str, Any]:
+        item = self.items[item_id]
+        # Fresh lists so callers can't mutate the catalog.
+        return {**item, "vibes": list(item.get("vibes") or []), "tags": list(item.get("tags") or [])}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.size,
+            "timed": len(self.starts),
+            "text_terms": len(self.text),
+            "location_terms": len(self.location),
+            "vibes": len(self.vibes),
+        }
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def time_window_bounds(time_window: Optional[str], now: Optional[datetime] = None) -> Optional[Tuple[float, float]]:
+    """Map phrases like "tonight" or "this weekend" to a (start, end) timestamp range."""
+    if not time_window:
+        return None
+    window = time_window.lower()
+    now = now or datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if "weekend" in window:
+        saturday = midnight + timedelta(days=(5 - now.weekday()) % 7)
+        start, end = max(saturday, now), saturday + timedelta(days=2)
+    elif "tomorrow" in window:
+        start = midnight + timedelta(days=1)
+        end = start + timedelta(days=1)
+    elif "tonight" in window:
+        start, end = max(midnight + timedelta(hours=17), now), midnight + timedelta(days=1, hours=3)
+    elif "today" in window or "now" in window:
+        start, end = now, midnight + timedelta(days=1, hours=3)
+    elif "week" in window:
+        start, end = now, now + timedelta(days=7)
+    else:
+        return None
+    return start.timestamp(), end.timestamp()
+
+
+def _seed_items(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    midnight = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    items: List[Dict[str, Any]] = []
+    for n, (title, summary, source, venue, address, city, vibes, tags, price, lat, lng, schedule) in enumerate(_SEED):
+        start_time = end_time = None
+        if schedule:
+            days, hour, duration = schedule
+            start = midnight + timedelta(days=days, hours=hour)
+            start_time = start.isoformat()
+            end_time = (start + timedelta(hours=duration)).isoformat()
+        items.append(
+            {
+                "id": f"{'eb' if source == 'eventbrite' else 'gp'}-{n + 1:03d}",
+                "title": title,
+                "summary": summary,
+                "source": source,
+                "venue": venue,
+                "address": f"{address}, {city}, MA",
+                "city": city,
+                "region": "MA",
+                "country": "US",
+                "lat": lat,
+                "lng": lng,
+                "booking_url": None,
+                "maps_url": f"https://www.google.com/maps/search/?api=1&query={lat},{lng}",
+                "price": price,
+                "vibes": list(vibes),
+                "tags": list(tags),
+                "start_time": start_time,
+                "end_time": end_time,
+            }
+        )
+    return items
+
+
+def _load_items() -> Tuple[List[Dict[str, Any]], bool]:
+    """Catalog items, and whether they are the built-in seed (dated relative to today)."""
+    if MOCK_EVENTS_PATH:
+        try:
+            with open(MOCK_EVENTS_PATH, "r", encoding="utf-8") as handle:
+                items = json.load(handle)
+            for n, item in enumerate(items):
+                item.setdefault("id", f"item-{n}")
+            return items, False
+        except (OSError, ValueError) as exc:
+            logger.error("Could not load MOCK_EVENTS_PATH %s, using built-in catalog: %s", MOCK_EVENTS_PATH, exc)
+    return _seed_items(), True
+
+
+_catalog: Optional[ActivityCatalog] = None
+# Day the seed catalog's schedule was resolved for; None for catalogs with fixed dates.
+_catalog_day: Optional[date] = None
+_catalog_lock = threading.Lock()
+
+
+def _catalog_stale(today: date) -> bool:
+    return _catalog is None or (_catalog_day is not None and _catalog_day != today)
+
+
+def get_catalog() -> ActivityCatalog:
+    global _catalog, _catalog_day
+    today = datetime.now().date()
+    if _catalog_stale(today):
+        with _catalog_lock:
+            if _catalog_stale(today):
+                items, seeded = _load_items()
+                _catalog = ActivityCatalog(items)
+                _catalog_day = today if seeded else None
+                logger.info("Activity catalog indexed: %s", _catalog.stats())
+    return _catalog
+
+
+def set_catalog(items: List[Dict[str, Any]]) -> ActivityCatalog:
+    """Replace the catalog (e.g. with a larger dataset) and rebuild its indexes."""
+    global _catalog, _catalog_day
+    catalog = ActivityCatalog(items)
+    with _catalog_lock:
+        _catalog = catalog
+        _catalog_day = None
+    return catalog
+
+
+def search_mock_events(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    ``EventItem`` dicts matching ``q``/``location``/``vibe``/``provider``/
+    ``time_window``; ``likes`` and ``tags`` boost matching items to the top.
+    """
+    catalog = get_catalog()
+    mask = catalog.select(
+        q=filters.get("q"),
+        location=filters.get("location"),
+        vibe=filters.get("vibe"),
+        provider=filters.get("provider"),
+        time_window=filters.get("time_window"),
+    )
+    boosts = list(filters.get("likes") or []) + list(filters.get("tags") or [])
+    ids = catalog.top(mask, boosts, int(filters.get("limit") or 25))
+    return [catalog.item(i) for i in ids]
+
+
+def get_tool_candidates(provider: str, query: Dict[str, Any], limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Raw provider-shaped candidates for ``provider`` when its API key is
+    missing. Vibe, likes and tags rank rather than filter so the planner
+    always has something to work with.
+    """
+    catalog = get_catalog()
+    mask = catalog.select(
+        location=query.get("location"),
+        provider=provider,
+        time_window=query.get("time_window"),
+        budget_cap=query.get("budget_cap"),
+        strict_location=False,
+    )
+    boosts = [query["vibe"]] if query.get("vibe") else []
+    boosts += list(query.get("likes") or []) + list(query.get("tags") or [])
+    wanted_vibe = _key(query.get("vibe"))
+
+    candidates: List[Dict[str, Any]] = []
+    for item_id in catalog.top(mask, boosts, limit):
+        item = catalog.item(item_id)
+        vibes = item["vibes"]
+        vibe = query.get("vibe") if wanted_vibe and wanted_vibe in {_key(v) for v in vibes} else (vibes[0] if vibes else None)
+        candidates.append(
+            {
+                "id": item["id"],
+                "title": item["title"],
+                "vibe": vibe,
+                "price": item.get("price"),
+                "address": item.get("address"),
+                "lat": item.get("lat"),
+                "lng": item.get("lng"),
+                "distance_km": None,
+                "booking_url": item.get("booking_url") or item.get("maps_url"),
+                "maps_url": item.get("maps_url"),
+                "source": item["source"],
+                "tags": item["tags"],
+                "summary": item.get("summary"),
+                "start_time": item.get("start_time"),
+            }
+        )
+    return candidates
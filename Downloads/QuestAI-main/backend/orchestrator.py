@@ -1,7 +1,9 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
-from .schemas import GroupRequest, PlanResponse
+from . import metrics, tracing
+from .schemas import GroupRequest, PlanResponse, PlanCard
 from .agents import ListenerAgent, PlannerAgent, WriterAgent
+from .tools import tool_stream_activities
 import os
 try:
     from .agentic import agentic_plan
@@ -12,19 +14,58 @@ listener = ListenerAgent()
 planner  = PlannerAgent()
 writer   = WriterAgent()
 
-def plan(req: GroupRequest) -> PlanResponse:
+
+def _response(req: GroupRequest, merged: Dict[str, Any], cards: List[PlanCard], action_log: List[str]) -> PlanResponse:
+    return PlanResponse(
+        query_normalized=req.query_text.strip(),
+        merged_vibe=merged.get("vibe", "chill"),
+        energy_profile=merged.get("energy_level", "medium"),
+        candidates=cards,
+        action_log=action_log
+    )
+
+
+def _debug(req: GroupRequest) -> bool:
+    return req.debug or os.getenv("PLAN_DEBUG") == "1"
+
+
+def _agentic() -> bool:
+    return os.getenv("USE_AGENTIC") == "1" and agentic_plan is not None
+
+
+def _trace_attributes(req: GroupRequest) -> Dict[str, Any]:
+    return {"mode": "agentic" if _agentic() else "pipeline", "group.size": len(req.user_ids)}
+
+
+async def plan(req: GroupRequest) -> PlanResponse:
+    # Debug requests are always traced so their trace id can be reported.
+    with tracing.trace("plan", force=req.debug, attributes=_trace_attributes(req)):
+        if not _debug(req):
+            return await _plan(req)
+        timings, token = metrics.start_timings()
+        try:
+            result = await _plan(req)
+        finally:
+            metrics.stop_timings(token)
+        result.action_log.extend(metrics.format_timings(timings))
+        if tracing.current_trace_id():
+            result.action_log.append(f"Trace: {tracing.current_trace_id()}")
+        return result
+
+
+async def _plan(req: GroupRequest) -> PlanResponse:
     # Use agentic controller if enabled and available
-    if os.getenv("USE_AGENTIC") == "1" and agentic_plan is not None:
-        return agentic_plan(req)
+    if _agentic():
+        return await agentic_plan(req)
 
     action_log = []
 
-    l_out = listener.run(req.query_text)
+    l_out = await listener.run(req.query_text)
     action_log.append("Listener: parsed vibes/time/budget")
 
     overrides: Dict[str, Any] = req.model_dump()
 
-    p_out = planner.run(
+    p_out = await planner.run(
         req.user_ids,
         l_out,
         req.location_hint or "Boston, MA",
@@ -32,16 +73,81 @@ def plan(req: GroupRequest) -> PlanResponse:
         overrides,
     )
     action_log.append("Planner: merged tastes & fetched activities")
+    if p_out.get("missing_user_ids"):
+        action_log.append(f"Planner: no saved profile for {', '.join(p_out['missing_user_ids'])}")
 
     cards = writer.run(p_out)
     action_log.append(f"Writer: scored {len(cards)} candidates")
 
-    merged_vibe = p_out["merged"].get("vibe", "chill")
-    energy_profile = p_out["merged"].get("energy_level", "medium")
-    return PlanResponse(
-        query_normalized=req.query_text.strip(),
-        merged_vibe=merged_vibe,
-        energy_profile=energy_profile,
-        candidates=cards,
-        action_log=action_log
+    return _response(req, p_out["merged"], cards, action_log)
+
+
+async def plan_stream(req: GroupRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of ``plan``. Yields events as the pipeline progresses:
+
+    * ``{"type": "action", "message": ...}`` for each ``action_log`` entry,
+    * ``{"type": "cards", "provider": ..., "candidates": [...]}`` with the
+      current top cards each time a provider answers and the ranking changes,
+    * ``{"type": "plan", "plan": ...}`` once, with the final ``PlanResponse``.
+
+    Debug streams end their actions with ``Trace: <trace_id>``, as ``plan`` does.
+    """
+    with tracing.trace("plan_stream", force=req.debug, attributes=_trace_attributes(req)):
+        timings, token = metrics.start_timings() if _debug(req) else (None, None)
+        try:
+            async for event in _plan_events(req, timings):
+                yield event
+        finally:
+            if token is not None:
+                metrics.stop_timings(token)
+
+
+async def _plan_events(req: GroupRequest, timings: Optional[List[Tuple[str, float]]]) -> AsyncIterator[Dict[str, Any]]:
+    action_log: List[str] = []
+
+    def action(message: str) -> Dict[str, Any]:
+        action_log.append(message)
+        return {"type": "action", "message": message}
+
+    if _agentic():
+        # The controller decides its own steps; report them once it is done.
+        result = await agentic_plan(req)
+        if timings is not None:
+            result.action_log.extend(metrics.format_timings(timings))
+            if tracing.current_trace_id():
+                result.action_log.append(f"Trace: {tracing.current_trace_id()}")
+        for message in result.action_log:
+            yield {"type": "action", "message": message}
+        yield {"type": "plan", "plan": result.model_dump()}
+        return
+
+    l_out = await listener.run(req.query_text)
+    yield action("Listener: parsed vibes/time/budget")
+
+    p_out = await planner.prepare(
+        req.user_ids,
+        l_out,
+        req.location_hint or "Boston, MA",
+        req.time_window,
+        req.model_dump(),
     )
+    yield action("Planner: merged tastes")
+    if p_out.get("missing_user_ids"):
+        yield action(f"Planner: no saved profile for {', '.join(p_out['missing_user_ids'])}")
+
+    merged = p_out["merged"]
+    cards: List[PlanCard] = []
+    async for provider, candidates in tool_stream_activities(merged):
+        yield action(f"Planner: {provider} returned; {len(candidates)} candidates so far")
+        ranked = writer.run({"merged": merged, "raw_candidates": candidates})
+        if [(c.title, c.group_score) for c in ranked] != [(c.title, c.group_score) for c in cards]:
+            cards = ranked
+            yield {"type": "cards", "provider": provider, "candidates": [c.model_dump() for c in cards]}
+
+    yield action(f"Writer: scored {len(cards)} candidates")
+    for message in metrics.format_timings(timings or []):
+        yield action(message)
+    if timings is not None and tracing.current_trace_id():
+        yield action(f"Trace: {tracing.current_trace_id()}")
+    yield {"type": "plan", "plan": _response(req, merged, cards, action_log).model_dump()}
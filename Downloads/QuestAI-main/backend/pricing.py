@@ -0,0 +1,44 @@
+"""
+Budget-to-price-level mapping shared by every candidate source.
+
+Live Places results and the in-memory catalog fallback both drop items whose
+price band is above ``budget_cap_to_price_level(budget_cap)``, so a given
+budget filters the same way whether or not API keys are configured.
+"""
+
+from typing import Any, Optional
+
+# Indexed by price level: Google's ``price_level`` 0-4.
+PRICE_BANDS = ("free", "$", "$$", "$$$", "$$$$")
+
+
+def budget_cap_to_price_level(budget_cap: Any) -> Optional[int]:
+    """Highest price level allowed for a per-person budget (USD); None when there is no cap."""
+    try:
+        cap = float(budget_cap)
+    except (TypeError, ValueError):
+        return None
+    if cap <= 0:
+        return 0
+    if cap <= 15:
+        return 1
+    if cap <= 30:
+        return 2
+    if cap <= 60:
+        return 3
+    return 4
+
+
+def price_band_to_level(price: Optional[str]) -> Optional[int]:
+    if not price:
+        return None
+    normalized = price.lower()
+    if normalized == "free":
+        return 0
+    return normalized.count("$")
+
+
+def google_price_to_band(price_level: Optional[int]) -> Optional[str]:
+    if price_level is None or not 0 <= price_level < len(PRICE_BANDS):
+        return None
+    return PRICE_BANDS[price_level]
@@ -33,13 +33,13 @@ Available tools (choose one 'action' per step):
 - reserve(args: {index?: number})
 - finalize(args: {})
 
-State context provided to you:
+State context provided to you (compact JSON):
 - query: the natural language mood
 - listener: structured intent from a Listener step (vibes, budget_hint, energy_level, time_hint)
-- tastes: array of user taste profiles if already fetched
+- group: deduplicated summary of fetched user tastes (size, vibe counts, top likes/tags, strictest budget/distance)
 - merged: merged constraints/preferences if already computed
-- observations: chronological log of tool results
-- raw_candidates: list of raw candidates, possibly enriched with sentiment
+- candidates: number of raw candidates found so far
+- new_observations: tool results since your previous decision
 
 Your job:
 1) Fetch tastes, 2) Merge with overrides from listener, 3) Find activities,
@@ -53,3 +53,35 @@ Output JSON schema (no prose):
   "rationale": "short reason for the chosen action"
 }
 """
+
+SYSTEM_CONTROLLER_PLAN = """You are an autonomous planning controller that uses tools to build a group activity plan.
+Instead of one action at a time, return the WHOLE remaining plan in one response as STRICT JSON only.
+
+Available tools (same as step mode):
+- get_tastes(args: {user_ids: string[]})
+- merge_tastes(args: {overrides?: {location?: string, time_window?: string, vibe?: string, energy_level?: 'low'|'medium'|'high'}})
+- find_activities(args: {})
+- search_places_grid(args: {})
+- enrich_sentiment(args: {})
+- probe_calendar(args: {})
+- reserve(args: {index?: number})
+- finalize(args: {})
+
+State context provided to you: query, listener, group, merged, candidates, new_observations (as in step mode).
+If replan_reason is present, an observation invalidated your previous plan; plan only the remaining work.
+
+Rules:
+- Order steps so each one's inputs exist when it runs; the last step MUST be finalize.
+- Use "after" to list ids of steps that must finish first. Steps that don't depend on each other
+  (e.g. enrich_sentiment and probe_calendar) may run in parallel.
+- Keep plans short: typically get_tastes → merge_tastes → find_activities → finalize.
+
+Output JSON schema (no prose):
+{
+  "plan": [
+    {"id": "s1", "action": "get_tastes", "args": {}, "after": []},
+    {"id": "s2", "action": "merge_tastes", "args": {}, "after": ["s1"]}
+  ],
+  "rationale": "short reason for the plan"
+}
+"""
@@ -0,0 +1,252 @@
+"""
+Activity provider registry and concurrent fan-out engine.
+
+Providers are plain functions that take the merged query dict and return a
+list of raw candidate dicts. Register them with ``@register_provider("name")``
+and ``fetch_all_providers`` will run every registered source in parallel,
+merging whatever comes back before the overall deadline.
+
+Responses are cached per provider under a canonicalised query key. Within
+``ttl`` a cached response is served as-is; for a further ``stale_ttl`` it is
+still served immediately while a background task refreshes it.
+"""
+
+import asyncio
+import copy
+import inspect
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from . import tracing
+from .cache import MISS, TTLCache, normalize_key
+from .metrics import observe
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+ProviderResult = List[Dict[str, Any]]
+ProviderFn = Callable[[Dict[str, Any]], Union[ProviderResult, Awaitable[ProviderResult]]]
+
+PROVIDER_TIMEOUT_S = float(os.getenv("PROVIDER_TIMEOUT_S", "12"))
+PROVIDER_CACHE_TTL_S = float(os.getenv("PROVIDER_CACHE_TTL_S", "300"))
+PROVIDER_CACHE_STALE_S = float(os.getenv("PROVIDER_CACHE_STALE_S", "900"))
+PROVIDER_CACHE_ENABLED = os.getenv("PROVIDER_CACHE_ENABLED", "1") == "1"
+
+_PROVIDERS: Dict[str, ProviderFn] = {}
+
+
+class _ProviderCache:
+    def __init__(self, name: str, ttl: float, stale_ttl: float) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Entries live for ttl + stale_ttl; "fresh_until" marks the end of the fresh window.
+        self.entries = TTLCache(f"provider:{name}", maxsize=2048, ttl=ttl + stale_ttl)
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "ttl_s": self.ttl,
+            "stale_ttl_s": self.stale_ttl,
+            "size": self.entries.stats()["size"],
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.fresh_hits + self.stale_hits) / total, 4) if total else 0.0,
+        }
+
+
+_CACHES: Dict[str, _ProviderCache] = {}
+# Identical concurrent fetches (same provider + canonical query) share one upstream call.
+_flight = SingleFlight("providers")
+_refreshing: Set[str] = set()
+_background: Set["asyncio.Task[Any]"] = set()
+
+
+def register_provider(
+    name: str,
+    ttl: Optional[float] = None,
+    stale_ttl: Optional[float] = None,
+) -> Callable[[ProviderFn], ProviderFn]:
+    """
+    Decorator that adds a fetcher to the fan-out. Later registrations replace
+    earlier ones. ``ttl``/``stale_ttl`` override the default cache windows.
+    """
+
+    def decorator(fn: ProviderFn) -> ProviderFn:
+        _PROVIDERS[name] = fn
+        _CACHES[name] = _ProviderCache(
+            name,
+            PROVIDER_CACHE_TTL_S if ttl is None else ttl,
+            PROVIDER_CACHE_STALE_S if stale_ttl is None else stale_ttl,
+        )
+        return fn
+
+    return decorator
+
+
+def canonical_query_key(query: Dict[str, Any]) -> str:
+    """Order- and case-insensitive key over the query fields providers actually use."""
+
+    def terms(values: Any) -> str:
+        return ",".join(sorted({normalize_key(v) for v in values or [] if normalize_key(v)}))
+
+    parts = [
+        normalize_key(query.get("location")),
+        normalize_key(query.get("vibe")),
+        terms(query.get("likes")),
+        terms(query.get("tags")),
+        str(query.get("budget_cap")),
+        str(query.get("distance_cap")),
+        normalize_key(query.get("time_window")),
+    ]
+    return "|".join(parts)
+
+
+def provider_cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in _CACHES.items()}
+
+
+def clear_provider_caches() -> None:
+    for cache in _CACHES.values():
+        cache.entries.clear()
+
+
+def registered_providers() -> List[str]:
+    return list(_PROVIDERS)
+
+
+async def _call_provider(name: str, fn: ProviderFn, query: Dict[str, Any]) -> ProviderResult:
+    started = time.perf_counter()
+    try:
+        if inspect.iscoroutinefunction(fn):
+            results = await fn(query)
+        else:
+            # Sync fetchers block on network I/O, so keep them off the event loop.
+            results = await asyncio.to_thread(fn, query)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error("Provider %s failed: %s", name, exc)
+        observe(f"provider:{name}", time.perf_counter() - started, "error")
+        return []
+    observe(f"provider:{name}", time.perf_counter() - started)
+    return list(results or [])
+
+
+def _store(name: str, key: str, results: ProviderResult) -> None:
+    # Empty lists are usually upstream errors; don't pin them in the cache.
+    if results:
+        cache = _CACHES[name]
+        cache.entries.set(key, {"results": copy.deepcopy(results), "fresh_until": time.time() + cache.ttl})
+
+
+async def _fetch_coalesced(name: str, fn: ProviderFn, key: str, query: Dict[str, Any]) -> ProviderResult:
+    return await _flight.do(f"{name}|{key}", lambda: _call_provider(name, fn, query))
+
+
+async def _refresh(name: str, fn: ProviderFn, key: str, query: Dict[str, Any]) -> None:
+    cache = _CACHES[name]
+    try:
+        results = await _fetch_coalesced(name, fn, key, query)
+        if results:
+            cache.refreshes += 1
+            _store(name, key, results)
+        else:
+            cache.refresh_failures += 1
+    finally:
+        _refreshing.discard(f"{name}|{key}")
+
+
+async def _run_provider(name: str, fn: ProviderFn, query: Dict[str, Any]) -> ProviderResult:
+    with tracing.span(f"provider:{name}", {"provider": name}):
+        results = await _lookup_provider(name, fn, query)
+        tracing.set_attribute("result.count", len(results))
+        return results
+
+
+async def _lookup_provider(name: str, fn: ProviderFn, query: Dict[str, Any]) -> ProviderResult:
+    key = canonical_query_key(query)
+    cache = _CACHES.get(name)
+    if not PROVIDER_CACHE_ENABLED or cache is None:
+        tracing.set_attribute("cache", "off")
+        return await _fetch_coalesced(name, fn, key, query)
+
+    entry = cache.entries.get(key)
+    if entry is not MISS:
+        if entry["fresh_until"] > time.time():
+            cache.fresh_hits += 1
+            tracing.set_attribute("cache", "fresh")
+        else:
+            cache.stale_hits += 1
+            tracing.set_attribute("cache", "stale")
+            refresh_id = f"{name}|{key}"
+            if refresh_id not in _refreshing:
+                _refreshing.add(refresh_id)
+                task = asyncio.create_task(_refresh(name, fn, key, dict(query)))
+                _background.add(task)
+                task.add_done_callback(_background.discard)
+        # Copy so downstream mutation (e.g. grid tagging) can't leak into the cache.
+        return copy.deepcopy(entry["results"])
+
+    cache.misses += 1
+    tracing.set_attribute("cache", "miss")
+    results = await _fetch_coalesced(name, fn, key, query)
+    _store(name, key, results)
+    return results
+
+
+async def iter_providers(
+    query: Dict[str, Any],
+    providers: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, ProviderResult]]:
+    """
+    Run the selected providers concurrently and yield ``(name, results)`` in
+    completion order, so callers can act on the first source to answer.
+    Providers still running at the deadline are cancelled and not yielded.
+    """
+    names = [n for n in (providers or registered_providers()) if n in _PROVIDERS]
+    tasks = {
+        asyncio.create_task(_run_provider(name, _PROVIDERS[name], query)): name
+        for name in names
+    }
+    deadline = time.monotonic() + (timeout if timeout is not None else PROVIDER_TIMEOUT_S)
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for task in pending:
+                    logger.warning("Provider %s timed out; returning partial results.", tasks[task])
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result()
+    finally:
+        # Also reached when the consumer stops iterating early.
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_all_providers(
+    query: Dict[str, Any],
+    providers: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, ProviderResult]:
+    """
+    Run the selected providers concurrently and return ``{name: results}``.
+    Providers that miss the deadline are cancelled and reported as empty, so
+    one slow source never holds back the others.
+    """
+    names = [n for n in (providers or registered_providers()) if n in _PROVIDERS]
+    results: Dict[str, ProviderResult] = {name: [] for name in names}
+    async for name, found in iter_providers(query, names, timeout):
+        results[name] = found
+    return results
@@ -0,0 +1,300 @@
+"""
+Shared resilience policy for outbound calls (geocode, Places, Eventbrite,
+Supabase, Gemini).
+
+Each upstream gets a bounded number of retries with full-jitter exponential
+backoff for transient errors (timeouts, connection errors, 429 and 5xx), a
+circuit breaker and, when configured, a token-bucket rate limit. After
+``failure_threshold`` consecutive transient failures the breaker opens and
+calls fail fast with ``CircuitOpenError`` for ``reset_timeout`` seconds, so
+a degraded provider drops out of the fan-out instead of slowing every plan;
+one trial call is then let through to probe recovery. Every attempt,
+retries included, passes the breaker and the bucket first.
+
+Rate limits are off unless ``RESILIENCE_<NAME>_RPS`` is set (burst
+``RESILIENCE_<NAME>_BURST``). A call never queues for a token longer than
+``RESILIENCE_MAX_WAIT_S`` or past its own deadline; it fails fast with
+``RateLimitedError`` instead. Retries and, for HTTP upstreams, timeouts are
+tunable via ``RESILIENCE_<NAME>_RETRIES`` and ``RESILIENCE_<NAME>_TIMEOUT_S``
+(Gemini keeps using ``GEMINI_TIMEOUT_S``).
+"""
+
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+BREAKER_FAILURES = int(os.getenv("RESILIENCE_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("RESILIENCE_BREAKER_RESET_S", "30"))
+RETRY_BASE_DELAY_S = float(os.getenv("RESILIENCE_RETRY_BASE_S", "0.2"))
+RETRY_MAX_DELAY_S = float(os.getenv("RESILIENCE_RETRY_MAX_S", "2"))
+# Longest a call queues for a rate-limit token before it is shed.
+MAX_WAIT_S = float(os.getenv("RESILIENCE_MAX_WAIT_S", "1"))
+
+# name -> (retries, timeout seconds)
+_DEFAULTS: Dict[str, tuple] = {
+    "geocode": (2, 5.0),
+    "google_places": (2, 8.0),
+    "eventbrite": (2, 8.0),
+    "supabase": (2, 5.0),
+    "gemini": (1, 0.0),
+}
+
+# google.api_core exception class names worth retrying (matched by name to
+# avoid importing the Gemini SDK here).
+_RETRYABLE_NAMES = {"ServiceUnavailable", "ResourceExhausted", "TooManyRequests", "InternalServerError", "DeadlineExceeded"}
+
+
+class RejectedError(Exception):
+    """The call was turned away without reaching the upstream."""
+
+
+class CircuitOpenError(RejectedError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class RateLimitedError(RejectedError):
+    """Raised instead of queueing longer than allowed for a rate-limit token."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = math.inf) -> Optional[float]:
+        """
+        Take a token, returning how long the caller must wait before using it,
+        or None (taking nothing) if that wait would exceed ``max_wait``.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # A negative balance is a queue: wait until it has been refilled.
+            wait = max(1 - self._tokens, 0.0) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def refund(self) -> None:
+        """Give back a token whose holder gave up (e.g. was cancelled) before using it."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # When the half-open trial call started; None when no trial is running.
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            now = time.monotonic()
+            # A trial that never reported back (e.g. cancelled) expires after reset_timeout.
+            if state == "half_open" and (self._probe_at is None or now - self._probe_at >= self.reset_timeout):
+                self._probe_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_at = None
+
+    def record_failure(self) -> bool:
+        """Count a transient failure; True when this call opened (or re-opened) the breaker."""
+        with self._lock:
+            self.failures += 1
+            reopen = self._probe_at is not None or (self.opened_at is None and self.failures >= self.failure_threshold)
+            self._probe_at = None
+            if reopen:
+                self.opened_at = time.monotonic()
+            return reopen
+
+
+class Policy:
+    def __init__(self, name: str) -> None:
+        retries, timeout = _DEFAULTS.get(name, (2, 10.0))
+        env = name.upper()
+        self.name = name
+        rate = float(os.getenv(f"RESILIENCE_{env}_RPS", "0"))
+        burst = int(os.getenv(f"RESILIENCE_{env}_BURST", max(math.ceil(rate), 1)))
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = int(os.getenv(f"RESILIENCE_{env}_RETRIES", retries))
+        self.timeout_s = float(os.getenv(f"RESILIENCE_{env}_TIMEOUT_S", timeout))
+        self.breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_S)
+        self.calls = 0
+        self.retried = 0
+        self.failures = 0
+        self.rejected = 0
+        self.shed = 0
+        self.throttled_s = 0.0
+        # Counters are bumped from the event loop (``call``) and worker threads (``call_sync``).
+        self._stats_lock = threading.Lock()
+
+    def count(self, counter: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = {
+                "calls": self.calls,
+                "retries": self.retried,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "shed": self.shed,
+                "throttled_s": round(self.throttled_s, 3),
+            }
+        return {"state": self.breaker.state, **counters}
+
+
+_policies: Dict[str, Policy] = {}
+_policies_lock = threading.Lock()
+
+
+def policy(name: str) -> Policy:
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = Policy(name)
+        return _policies[name]
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return type(exc).__name__ in _RETRYABLE_NAMES
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_MAX_DELAY_S, RETRY_BASE_DELAY_S * (2 ** attempt)))
+
+
+def _admit(p: Policy, deadline: Optional[float]) -> float:
+    """
+    Pass the breaker and take a rate-limit token for one attempt; returns how
+    long to wait before making it.
+    """
+    if not p.breaker.allow():
+        p.count("rejected")
+        tracing.set_attribute("circuit", "open")
+        raise CircuitOpenError(f"{p.name} circuit is open; skipping call")
+    max_wait = MAX_WAIT_S if deadline is None else max(min(MAX_WAIT_S, deadline - time.monotonic()), 0.0)
+    wait = p.bucket.reserve(max_wait)
+    if wait is None:
+        p.count("shed")
+        tracing.set_attribute("rate_limited", True)
+        raise RateLimitedError(f"{p.name} rate limit would delay the call past {max_wait:.2f}s")
+    p.count("calls")
+    if wait:
+        p.count("throttled_s", wait)
+        tracing.set_attribute("throttled_ms", round(wait * 1000, 1))
+    return wait
+
+
+def _settle(p: Policy, exc: BaseException, attempt: int) -> bool:
+    """Book a failed attempt; True if it should be retried."""
+    transient = is_retryable(exc)
+    # A half-open trial call is not retried: its failure re-opens the breaker.
+    if transient and attempt < p.retries and p.breaker.state == "closed":
+        p.count("retried")
+        tracing.set_attribute("retries", attempt + 1)
+        return True
+    p.count("failures")
+    if transient and p.breaker.record_failure():
+        logger.warning("Circuit for %s opened after repeated failures: %s", p.name, exc)
+    elif not transient:
+        # The upstream answered (e.g. a 4xx); it is reachable, just unhappy with the request.
+        p.breaker.record_success()
+    return False
+
+
+async def call(name: str, fn: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+    """
+    Run ``fn`` under ``name``'s rate limit, retry policy and circuit breaker.
+    ``deadline`` (``time.monotonic()``) bounds how long it may queue for a token.
+    """
+    p = policy(name)
+    attempt = 0
+    while True:
+        wait = _admit(p, deadline)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                p.bucket.refund()
+                raise
+        try:
+            result = await fn()
+        except Exception as exc:  # pylint: disable=broad-except
+            if not _settle(p, exc, attempt):
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        p.breaker.record_success()
+        return result
+
+
+def call_sync(name: str, fn: Callable[[], T], deadline: Optional[float] = None) -> T:
+    """Blocking twin of ``call`` for code already running in a worker thread (Supabase)."""
+    p = policy(name)
+    attempt = 0
+    while True:
+        wait = _admit(p, deadline)
+        if wait:
+            time.sleep(wait)
+        try:
+            result = fn()
+        except Exception as exc:  # pylint: disable=broad-except
+            if not _settle(p, exc, attempt):
+                raise
+            time.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        p.breaker.record_success()
+        return result
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {name: p.stats() for name, p in _policies.items()}
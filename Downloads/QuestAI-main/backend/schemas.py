@@ -9,6 +9,17 @@ class UserTaste(BaseModel):
     budget_max: Optional[float] = None
     distance_km_max: Optional[float] = None
     tags: List[str] = []
+    # Profile version (``PROFILE_VERSION_COLUMN``, e.g. updated_at); keys memoized group merges.
+    version: Optional[str] = None
+
+class FriendOverride(BaseModel):
+    user_id: str
+    display_name: Optional[str] = None
+    likes: List[str] = Field(default_factory=list)
+    vibes: List[str] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+    budget_max: Optional[float] = None
+    distance_km_max: Optional[float] = None
 
 class GroupRequest(BaseModel):
     query_text: str
@@ -20,15 +31,9 @@ class GroupRequest(BaseModel):
     distance_km: Optional[float] = None
     custom_likes: List[str] = Field(default_factory=list)
     custom_tags: List[str] = Field(default_factory=list)
-
-class FriendOverride(BaseModel):
-    user_id: str
-    display_name: Optional[str] = None
-    likes: List[str] = Field(default_factory=list)
-    vibes: List[str] = Field(default_factory=list)
-    tags: List[str] = Field(default_factory=list)
-    budget_max: Optional[float] = None
-    distance_km_max: Optional[float] = None
+    friend_overrides: List[FriendOverride] = Field(default_factory=list)
+    # Append per-stage durations to action_log (also enabled globally by PLAN_DEBUG=1).
+    debug: bool = False
 
 class PlanCard(BaseModel):
     title: str
@@ -48,6 +53,26 @@ class PlanCard(BaseModel):
     reasons: List[str]
     source: str
 
+class EventItem(BaseModel):
+    id: str
+    title: str
+    summary: Optional[str] = None
+    source: str
+    venue: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    region: Optional[str] = None
+    country: Optional[str] = None
+    lat: float
+    lng: float
+    booking_url: Optional[str] = None
+    maps_url: Optional[str] = None
+    price: Optional[str] = None
+    vibes: List[str] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+
 class PlanResponse(BaseModel):
     query_normalized: str
     merged_vibe: Optional[str] = None
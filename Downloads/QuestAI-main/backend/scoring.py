@@ -0,0 +1,96 @@
+"""
+Batched candidate scoring for ``WriterAgent``.
+
+Features for the whole candidate pool are packed into NumPy arrays and
+scored in one pass; ``top_k`` then picks the winners in O(n) so that
+``PlanCard`` models are only built for the handful that get returned.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+BASE_SCORE = 0.4
+VIBE_WEIGHT = 0.3
+PRICE_WEIGHT = 0.2
+LIKES_WEIGHT = 0.1
+# Bonus for being close to the origin, scaled linearly to zero at the distance cap.
+# Only counted when the group has a distance cap.
+DISTANCE_WEIGHT = 0.1
+
+
+def _lower(value: Any) -> str:
+    return str(value or "").lower()
+
+
+def _float_or_nan(value: Any) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def score_candidates(candidates: List[Dict[str, Any]], merged: Dict[str, Any]) -> np.ndarray:
+    """
+    Group-fit score in ``[0, 1]`` for each raw candidate: the weighted sum
+    divided by the total weight of the terms that apply.
+    """
+    n = len(candidates)
+    if n == 0:
+        return np.zeros(0)
+
+    merged_vibe = _lower(merged.get("vibe"))
+    budget_cap = merged.get("budget_cap")
+    cheap_ok = budget_cap is None or budget_cap >= 10
+    likes = set(merged.get("likes") or [])
+
+    # A candidate without its own vibe inherits the group's.
+    vibes = np.array([_lower(c.get("vibe")) or merged_vibe for c in candidates])
+    prices = np.array([_lower(c.get("price")) for c in candidates])
+    liked = np.fromiter(
+        (bool(likes) and not likes.isdisjoint(c.get("tags") or []) for c in candidates), dtype=bool, count=n
+    )
+    distances = np.fromiter((_float_or_nan(c.get("distance_km")) for c in candidates), dtype=float, count=n)
+
+    scores = np.full(n, BASE_SCORE)
+    if merged_vibe:
+        scores += VIBE_WEIGHT * (vibes == merged_vibe)
+    price_ok = prices == "free"
+    if cheap_ok:
+        price_ok |= prices == "$"
+    scores += PRICE_WEIGHT * price_ok
+    scores += LIKES_WEIGHT * liked
+    total = BASE_SCORE + VIBE_WEIGHT + PRICE_WEIGHT + LIKES_WEIGHT
+
+    distance_cap = _float_or_nan(merged.get("distance_cap"))
+    if distance_cap > 0:
+        closeness = np.clip(1.0 - distances / distance_cap, 0.0, 1.0)
+        scores += DISTANCE_WEIGHT * np.nan_to_num(closeness, nan=0.0)
+        total += DISTANCE_WEIGHT
+
+    return scores / total
+
+
+def top_k(scores: np.ndarray, k: int) -> List[int]:
+    """
+    Indices of the ``k`` best scores, best first. Equal scores keep their
+    input order, matching a stable descending sort of the whole array.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return []
+    if k >= n:
+        return np.argsort(-scores, kind="stable").tolist()
+
+    threshold = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[: k - len(above)]
+    chosen = np.concatenate([above, tied])
+    # Sort by score descending, then by original index.
+    return chosen[np.lexsort((chosen, -scores[chosen]))].tolist()
+
+
+def pick(candidates: List[Dict[str, Any]], merged: Dict[str, Any], k: int) -> List[Tuple[Dict[str, Any], float]]:
+    """``(candidate, score)`` pairs for the top ``k`` candidates."""
+    scores = score_candidates(candidates, merged)
+    return [(candidates[i], float(scores[i])) for i in top_k(scores, k)]
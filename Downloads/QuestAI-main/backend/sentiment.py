@@ -0,0 +1,202 @@
+"""
+Local batched sentiment scoring for ``tool_sentiment_enrich``.
+
+Review and summary text is scored against a small valence lexicon with no
+model service involved. Tokens are hashed with ``zlib.crc32`` into a fixed
+weight vector, so the whole batch is scored with one NumPy gather and two
+``bincount`` reductions. A negator ("not", "never", "n't") flips the next
+few words of its clause. The summed valence is squashed into ``[-1, 1]``
+the way VADER does it.
+
+Results are cached per venue (``place_id`` or event id) for
+``SENTIMENT_CACHE_TTL_S``. A venue seen by earlier plans isn't rescored.
+Extra lexicon entries can be loaded from ``SENTIMENT_LEXICON_PATH``, a JSON
+object of ``{"word": weight}`` on the same -4..4 scale.
+"""
+
+import json
+import logging
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import MISS, TTLCache, normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Large enough that ordinary words rarely collide with a lexicon entry.
+HASH_BUCKETS = 1 << 18
+NEGATION_SPAN = 3
+# VADER's normalisation constant: score / sqrt(score^2 + ALPHA).
+ALPHA = 15.0
+POSITIVE_THRESHOLD = 0.05
+
+_LEXICON: Dict[str, float] = {
+    # positive
+    "amazing": 3.1, "awesome": 3.1, "excellent": 3.2, "fantastic": 3.2, "outstanding": 3.1,
+    "wonderful": 3.0, "incredible": 2.9, "perfect": 3.0, "best": 3.0, "love": 3.0, "loved": 2.9,
+    "great": 3.0, "superb": 3.1, "delicious": 2.8, "beautiful": 2.9, "gorgeous": 2.9,
+    "good": 1.9, "nice": 1.8, "fun": 2.3, "enjoyed": 2.3, "enjoy": 2.2, "friendly": 2.2,
+    "welcoming": 2.0, "cozy": 1.9, "cosy": 1.9, "charming": 2.2, "lively": 1.7, "relaxing": 1.9,
+    "relaxed": 1.8, "chill": 1.2, "clean": 1.7, "helpful": 1.9, "recommend": 1.8,
+    "recommended": 1.8, "favorite": 2.0, "favourite": 2.0, "fresh": 1.3, "tasty": 2.0,
+    "attentive": 1.8, "vibrant": 1.9, "stunning": 2.9, "memorable": 2.0, "worth": 1.2,
+    "happy": 2.7, "pleasant": 2.0, "solid": 1.0, "gem": 2.2, "impressive": 2.4, "unique": 1.2,
+    "affordable": 1.5, "spacious": 1.3, "quiet": 0.8, "free": 0.8,
+    # negative
+    "terrible": -3.1, "awful": -3.1, "horrible": -3.2, "worst": -3.1, "disgusting": -3.2,
+    "hate": -2.7, "hated": -2.6, "bad": -2.5, "poor": -2.1, "rude": -2.0, "dirty": -1.9,
+    "boring": -1.8, "bland": -1.4, "disappointing": -2.2, "disappointed": -2.1, "mediocre": -1.4,
+    "overpriced": -1.9, "expensive": -0.9, "crowded": -1.0, "cramped": -1.3, "loud": -0.7,
+    "noisy": -1.1, "slow": -1.0, "cold": -0.7, "stale": -1.5, "unfriendly": -2.0, "avoid": -1.9,
+    "scam": -2.8, "closed": -1.0, "cancelled": -1.5, "canceled": -1.5, "waste": -2.2,
+    "unsafe": -2.4, "sketchy": -1.8, "smelly": -1.9, "broken": -1.6, "wait": -0.5,
+    "meh": -0.8, "okay": 0.6, "ok": 0.5, "fine": 0.8,
+}
+_NEGATORS = {"not", "no", "never", "nothing", "nobody", "neither", "nor", "without", "hardly", "isn't",
+             "wasn't", "aren't", "weren't", "don't", "doesn't", "didn't", "can't", "couldn't", "won't"}
+
+# Words, plus clause punctuation that ends a negation's reach.
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|[.,;:!?]")
+_CLAUSE_BREAKS = frozenset(".,;:!?")
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & (HASH_BUCKETS - 1)
+
+
+def _build_weights() -> np.ndarray:
+    lexicon = dict(_LEXICON)
+    path = os.getenv("SENTIMENT_LEXICON_PATH")
+    if path:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                lexicon.update({str(k).lower(): float(v) for k, v in json.load(fh).items()})
+        except (OSError, ValueError, AttributeError) as exc:
+            logger.error("Failed to load sentiment lexicon %s: %s", path, exc)
+    weights = np.zeros(HASH_BUCKETS, dtype=np.float32)
+    for word, weight in lexicon.items():
+        weights[_bucket(word)] = weight
+    return weights
+
+
+_WEIGHTS = _build_weights()
+
+_cache = TTLCache(
+    "sentiment",
+    maxsize=int(os.getenv("SENTIMENT_CACHE_SIZE", "8192")),
+    ttl=float(os.getenv("SENTIMENT_CACHE_TTL_S", str(24 * 3600))),
+)
+
+
+@lru_cache(maxsize=65536)
+def _encode(text: str) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """(hash buckets, +1/-1 polarity) per token, with negation applied."""
+    buckets: List[int] = []
+    signs: List[int] = []
+    negated = 0
+    for token in _TOKEN.findall(text.lower()):
+        if token in _CLAUSE_BREAKS:
+            negated = 0
+            continue
+        if token in _NEGATORS or token.endswith("n't"):
+            negated = NEGATION_SPAN
+            continue
+        buckets.append(_bucket(token))
+        if negated:
+            signs.append(-1)
+            negated -= 1
+        else:
+            signs.append(1)
+    return tuple(buckets), tuple(signs)
+
+
+def score_texts(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Compound valence in ``[-1, 1]`` and the number of lexicon hits for each text."""
+    n = len(texts)
+    if n == 0:
+        return np.zeros(0), np.zeros(0, dtype=int)
+    encoded = [_encode(text) for text in texts]
+    lengths = np.fromiter((len(buckets) for buckets, _ in encoded), dtype=np.intp, count=n)
+    docs = np.repeat(np.arange(n), lengths)
+    buckets = np.fromiter((b for bs, _ in encoded for b in bs), dtype=np.intp, count=int(lengths.sum()))
+    signs = np.fromiter((s for _, ss in encoded for s in ss), dtype=float, count=int(lengths.sum()))
+
+    valence = _WEIGHTS[buckets].astype(float) * signs
+    totals = np.bincount(docs, weights=valence, minlength=n)
+    hits = np.bincount(docs, weights=valence != 0, minlength=n).astype(int)
+    return totals / np.sqrt(totals * totals + ALPHA), hits
+
+
+def _texts(candidate: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for review in candidate.get("reviews") or []:
+        parts.append((review.get("text") or "") if isinstance(review, dict) else str(review))
+    for field in ("summary", "description"):
+        value = candidate.get(field)
+        if isinstance(value, dict):
+            value = value.get("text")
+        if value:
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def venue_key(candidate: Dict[str, Any]) -> Optional[str]:
+    """Stable per-venue cache key: provider id, else normalised title and address."""
+    ident = candidate.get("place_id") or candidate.get("id")
+    if ident:
+        return f"{candidate.get('source') or ''}:{ident}"
+    title = normalize_key(candidate.get("title"))
+    if not title:
+        return None
+    return f"~{title}|{normalize_key(candidate.get('address'))}"
+
+
+def _label(score: float, hits: int) -> Dict[str, Any]:
+    if score >= POSITIVE_THRESHOLD:
+        overall = "positive"
+    elif score <= -POSITIVE_THRESHOLD:
+        overall = "negative"
+    else:
+        overall = "neutral"
+    # More matched words means more evidence; text with none stays a low-confidence neutral.
+    confidence = round(min(0.95, 0.4 + 0.1 * hits), 2)
+    return {"overall": overall, "score": round(score, 3), "confidence": confidence, "signals": hits}
+
+
+def enrich(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set ``sentiment`` on each candidate in place, scoring only venues not cached yet."""
+    pending: Dict[str, List[int]] = {}
+    uncached: List[int] = []
+    for i, candidate in enumerate(candidates):
+        key = venue_key(candidate)
+        cached = _cache.get(key) if key else MISS
+        if cached is not MISS:
+            candidate["sentiment"] = dict(cached)
+        elif key:
+            pending.setdefault(key, []).append(i)
+        else:
+            uncached.append(i)
+
+    # One text per venue (its first occurrence), plus candidates without a key.
+    firsts = [indexes[0] for indexes in pending.values()] + uncached
+    if not firsts:
+        return candidates
+    scores, hits = score_texts([_texts(candidates[i]) for i in firsts])
+    results = [_label(float(s), int(h)) for s, h in zip(scores, hits)]
+    for (key, indexes), result in zip(pending.items(), results):
+        _cache.set(key, result)
+        for i in indexes:
+            candidates[i]["sentiment"] = dict(result)
+    for i, result in zip(uncached, results[len(pending):]):
+        candidates[i]["sentiment"] = result
+    return candidates
+
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
@@ -0,0 +1,63 @@
+"""
+Request coalescing ("singleflight") for identical in-flight upstream calls.
+
+Concurrent callers asking for the same key share one upstream coroutine
+instead of each issuing their own request. The shared call runs as its own
+task, so a caller that is cancelled (e.g. by a provider deadline) doesn't
+cancel it for everyone else.
+"""
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.shared = 0
+        _groups[name] = self
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]], copy_result: bool = True) -> T:
+        """
+        Await ``fn()`` unless an identical call is already in flight, in which
+        case wait for that one. Every caller gets its own deep copy of the
+        result (so one request can't mutate another's) unless ``copy_result``
+        is False, e.g. for immutable values.
+        """
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self.shared += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result) if copy_result else result
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved so an unawaited failure doesn't warn.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.shared
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.leaders,
+            "coalesced": self.shared,
+            "coalesced_rate": round(self.shared / total, 4) if total else 0.0,
+        }
+
+
+def singleflight_stats() -> Dict[str, Any]:
+    return {name: group.stats() for name, group in _groups.items()}
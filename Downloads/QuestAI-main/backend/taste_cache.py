@@ -0,0 +1,113 @@
+"""
+In-process cache of ``UserTaste`` objects keyed by user id.
+
+Entries are fresh for ``ttl`` seconds. Once stale they are revalidated against
+the profile's version column (``updated_at`` by default): an unchanged
+version renews the entry without re-reading the row, a changed one forces a
+refetch. ``invalidate`` drops entries explicitly, e.g. after a profile edit.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schemas import UserTaste
+
+
+class TasteCache:
+    def __init__(self, ttl: float = 300.0, maxsize: int = 4096) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # user_id -> (taste, version, expires_at)
+        self._entries: "OrderedDict[str, Tuple[UserTaste, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.refetched = 0
+        self.bypassed = 0
+        self.invalidations = 0
+
+    def lookup(
+        self, user_ids: List[str]
+    ) -> Tuple[Dict[str, UserTaste], Dict[str, Any], List[str]]:
+        """
+        Split ids into ``(fresh tastes, stale id -> cached version, absent ids)``.
+        Stale entries stay in place until ``renew`` or ``put`` resolves them.
+        """
+        now = time.time()
+        fresh: Dict[str, UserTaste] = {}
+        stale: Dict[str, Any] = {}
+        absent: List[str] = []
+        with self._lock:
+            for uid in user_ids:
+                entry = self._entries.get(uid)
+                if entry is None:
+                    absent.append(uid)
+                    self.misses += 1
+                elif entry[2] > now:
+                    self._entries.move_to_end(uid)
+                    fresh[uid] = entry[0]
+                    self.hits += 1
+                else:
+                    stale[uid] = entry[1]
+        return fresh, stale, absent
+
+    def renew(self, user_id: str) -> Optional[UserTaste]:
+        """Extend a stale entry whose version is unchanged and return its taste."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            self._entries[user_id] = (entry[0], entry[1], time.time() + self.ttl)
+            self._entries.move_to_end(user_id)
+            self.revalidated += 1
+            return entry[0]
+
+    def put(self, user_id: str, taste: UserTaste, version: Any = None, refetch: bool = False) -> None:
+        with self._lock:
+            self._entries[user_id] = (taste, version, time.time() + self.ttl)
+            self._entries.move_to_end(user_id)
+            if refetch:
+                self.refetched += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def peek(self, user_id: str) -> Optional[UserTaste]:
+        """Return an entry regardless of age, without touching counters or recency."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry[0] if entry else None
+
+    def record_bypass(self, count: int = 1) -> None:
+        with self._lock:
+            self.bypassed += count
+
+    def invalidate(self, user_id: Optional[str] = None) -> int:
+        """Drop one user's entry, or everything when ``user_id`` is None. Returns entries removed."""
+        with self._lock:
+            if user_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                removed = 1 if self._entries.pop(user_id, None) is not None else 0
+            self.invalidations += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses + self.revalidated + self.refetched
+            served = self.hits + self.revalidated
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "refetched": self.refetched,
+                "bypassed": self.bypassed,
+                "invalidations": self.invalidations,
+                "hit_rate": round(served / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,228 @@
+"""
+Memoized, incremental group taste merging behind ``tool_merge_tastes``.
+
+A group's merge is keyed by its members' sorted ``(user_id, version)``
+pairs. The version is the profile's ``updated_at`` (or a content
+fingerprint for tastes without one, e.g. request overrides). Repeat plans
+for the same friends, and the agentic controller re-merging within one
+request, are served from the memo.
+
+On a miss the engine reuses a cached aggregate when it can. Examples are
+the same group with one profile edited, or a group with one member added
+or removed. It then applies only the difference with ``GroupTaste.add`` /
+``remove``. Running counters make this cost one member's lists rather than
+the whole group's.
+"""
+
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .schemas import UserTaste
+
+DEFAULT_VIBE = "chill"
+DEFAULT_BUDGET = 30  # default to <$30 if unknown
+DEFAULT_DISTANCE = 5
+
+Member = Tuple[str, str]
+
+
+def member_key(taste: UserTaste) -> Member:
+    if taste.version:
+        return taste.user_id, f"v:{taste.version}"
+    # A digest of canonical JSON, unlike hash(), is the same in every process.
+    content = json.dumps(
+        [taste.vibes, taste.likes, taste.tags, taste.budget_max, taste.distance_km_max],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return taste.user_id, f"h:{hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _group_key(members: Iterable[Member]) -> str:
+    return "|".join(f"{uid}@{version}" for uid, version in sorted(members))
+
+
+def _without_one(sorted_ids: List[str]) -> Iterator[str]:
+    """Keys of every id set with one member of ``sorted_ids`` dropped."""
+    for i, uid in enumerate(sorted_ids):
+        if i == 0 or uid != sorted_ids[i - 1]:
+            yield "|".join(sorted_ids[:i] + sorted_ids[i + 1:])
+
+
+class GroupTaste:
+    """Running vibe/like/tag counts and budget/distance multisets for one group."""
+
+    def __init__(self) -> None:
+        self.members: Dict[Member, Tuple[UserTaste, int]] = {}
+        self.vibes: Counter = Counter()
+        self.likes: Counter = Counter()
+        self.tags: Counter = Counter()
+        self.budgets: Counter = Counter()
+        self.distances: Counter = Counter()
+
+    def copy(self) -> "GroupTaste":
+        other = GroupTaste()
+        other.members = dict(self.members)
+        for name in ("vibes", "likes", "tags", "budgets", "distances"):
+            setattr(other, name, Counter(getattr(self, name)))
+        return other
+
+    def _apply(self, taste: UserTaste, sign: int) -> None:
+        for counter, values in ((self.vibes, taste.vibes), (self.likes, taste.likes), (self.tags, taste.tags)):
+            for value in values:
+                counter[value] += sign
+                if counter[value] <= 0:
+                    del counter[value]
+        for counter, value in ((self.budgets, taste.budget_max), (self.distances, taste.distance_km_max)):
+            if value is None:
+                continue
+            counter[value] += sign
+            if counter[value] <= 0:
+                del counter[value]
+
+    def add(self, taste: UserTaste) -> None:
+        key = member_key(taste)
+        entry = self.members.get(key)
+        # The same user may appear twice in a request; count them twice, as a fresh merge would.
+        self.members[key] = (taste, entry[1] + 1 if entry else 1)
+        self._apply(taste, 1)
+
+    def remove(self, key: Member) -> None:
+        taste, count = self.members[key]
+        if count > 1:
+            self.members[key] = (taste, count - 1)
+        else:
+            del self.members[key]
+        self._apply(taste, -1)
+
+    def member_keys(self) -> Counter:
+        return Counter({key: count for key, (_, count) in self.members.items()})
+
+    def _top_vibe(self) -> str:
+        if not self.vibes:
+            return DEFAULT_VIBE
+        best = max(self.vibes.values())
+        tied = [vibe for vibe, count in self.vibes.items() if count == best]
+        if len(tied) == 1:
+            return tied[0]
+        # Break ties by first mention in member order, so the winner doesn't depend on merge history.
+        tied_set = set(tied)
+        for key in sorted(self.members):
+            for vibe in self.members[key][0].vibes:
+                if vibe in tied_set:
+                    return vibe
+        return tied[0]
+
+    def merged(self) -> Dict[str, Any]:
+        return {
+            "merged_vibe": self._top_vibe(),
+            "budget_cap": min(self.budgets) if self.budgets else DEFAULT_BUDGET,
+            "distance_cap": min(self.distances) if self.distances else DEFAULT_DISTANCE,
+            # Sorted so the result doesn't depend on the order members were added.
+            "likes": sorted(self.likes),
+            "tags": sorted(self.tags),
+        }
+
+
+def _copy_merged(merged: Dict[str, Any]) -> Dict[str, Any]:
+    # Callers add request fields to the merged dict; keep the memoized one pristine.
+    return {**merged, "likes": list(merged["likes"]), "tags": list(merged["tags"])}
+
+
+class TasteMergeEngine:
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        # group key -> (aggregate, merged)
+        self._groups: "OrderedDict[str, Tuple[GroupTaste, Dict[str, Any]]]" = OrderedDict()
+        # user-id set -> latest group key with exactly those members (any versions)
+        self._by_ids: "OrderedDict[str, str]" = OrderedDict()
+        # user-id set -> group key of a cached group with one extra member
+        self._supersets: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.incremental = 0
+        self.rebuilds = 0
+
+    def merge(self, tastes: List[UserTaste]) -> Dict[str, Any]:
+        members = [member_key(t) for t in tastes]
+        key = _group_key(members)
+        with self._lock:
+            cached = self._groups.get(key)
+            if cached is not None:
+                self._groups.move_to_end(key)
+                self.hits += 1
+                return _copy_merged(cached[1])
+            user_ids = sorted(uid for uid, _ in members)
+            base = self._nearest(user_ids)
+
+        if base is not None:
+            group = base.copy()
+            wanted = Counter(members)
+            have = group.member_keys()
+            for gone in (have - wanted).elements():
+                group.remove(gone)
+            by_key = {member_key(t): t for t in tastes}
+            for new in (wanted - have).elements():
+                group.add(by_key[new])
+        else:
+            group = GroupTaste()
+            for taste in tastes:
+                group.add(taste)
+        merged = group.merged()
+
+        with self._lock:
+            if base is not None:
+                self.incremental += 1
+            else:
+                self.rebuilds += 1
+            self._remember(key, user_ids, group, merged)
+        return _copy_merged(merged)
+
+    def _nearest(self, sorted_ids: List[str]) -> Optional[GroupTaste]:
+        """A cached aggregate one member (or some profile versions) away from ``sorted_ids``."""
+        ids_key = "|".join(sorted_ids)
+        # Same members, then a group with one extra member, then groups missing one.
+        candidates = chain(
+            (self._by_ids.get(ids_key), self._supersets.get(ids_key)),
+            (self._by_ids.get(smaller) for smaller in _without_one(sorted_ids)),
+        )
+        for key in candidates:
+            if key is not None and key in self._groups:
+                return self._groups[key][0]
+        return None
+
+    def _remember(self, key: str, sorted_ids: List[str], group: GroupTaste, merged: Dict[str, Any]) -> None:
+        self._groups[key] = (group, merged)
+        self._groups.move_to_end(key)
+        ids_key = "|".join(sorted_ids)
+        self._by_ids[ids_key] = key
+        self._by_ids.move_to_end(ids_key)
+        for smaller in _without_one(sorted_ids):
+            self._supersets[smaller] = key
+        for index in (self._groups, self._by_ids):
+            while len(index) > self.maxsize:
+                index.popitem(last=False)
+        while len(self._supersets) > self.maxsize * 4:
+            self._supersets.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._by_ids.clear()
+            self._supersets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.incremental + self.rebuilds
+            return {
+                "size": len(self._groups),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "incremental": self.incremental,
+                "rebuilds": self.rebuilds,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -1,60 +1,208 @@
 # These are the callable “functions” the LLM will use.
 # In dev, they can return mock data; Friend 2 will later wire real APIs.
 
+import asyncio
+import copy
 import os
 import re
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
-from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import quote_plus
 
 import httpx
 from supabase import Client  # type: ignore
 
+from backend import resilience, sentiment, tracing
 from backend.schemas import UserTaste, FriendOverride
 from backend.supabase_client import safe_get_supabase_client
+from backend.cache import MISS, TTLCache, normalize_key
+from backend.dedup import dedupe_candidates
+from backend.geo import apply_distances, tile_circle
+from backend.http_client import get_async_client
+from backend.metrics import timed
 from backend.mock_events import get_tool_candidates
+from backend.pricing import budget_cap_to_price_level, google_price_to_band, price_band_to_level
+from backend.providers import fetch_all_providers, iter_providers, register_provider
+from backend.singleflight import SingleFlight
+from backend.taste_cache import TasteCache
+from backend.taste_merge import TasteMergeEngine
 
 logger = logging.getLogger(__name__)
 
+_PROFILE_COLUMNS = "id, display_name, likes, vibes, tags, budget_max, distance_km_max"
+# Column used to detect profile edits when a cached taste goes stale; empty disables the check.
+_PROFILE_VERSION_COLUMN = os.getenv("PROFILE_VERSION_COLUMN", "updated_at")
+
+# Upstream API roots; point them at local stand-ins for offline runs (see backend/benchmark.py).
+GOOGLE_MAPS_API_BASE = os.getenv("GOOGLE_MAPS_API_BASE", "https://maps.googleapis.com").rstrip("/")
+EVENTBRITE_API_BASE = os.getenv("EVENTBRITE_API_BASE", "https://www.eventbriteapi.com").rstrip("/")
+
+_taste_cache = TasteCache(
+    ttl=float(os.getenv("TASTE_CACHE_TTL_S", "300")),
+    maxsize=int(os.getenv("TASTE_CACHE_SIZE", "4096")),
+)
+_taste_merge = TasteMergeEngine(maxsize=int(os.getenv("TASTE_MERGE_CACHE_SIZE", "1024")))
+
+
+async def _http_get(upstream: str, url: str, **kwargs: Any) -> httpx.Response:
+    """GET via the shared pool under ``upstream``'s rate limit, retries and circuit breaker."""
+
+    async def attempt() -> httpx.Response:
+        resp = await get_async_client().get(url, timeout=resilience.policy(upstream).timeout_s, **kwargs)
+        tracing.set_attribute("http.status_code", resp.status_code)
+        resp.raise_for_status()
+        return resp
+
+    with tracing.span(f"http:{upstream}", {"upstream": upstream, "http.method": "GET", "http.url": url}):
+        return await resilience.call(upstream, attempt)
+
+
 # === Data-access contracts Friend 2 will implement for real ===
-def _fetch_profile_from_supabase(user_id: str) -> Optional[Dict[str, Any]]:
+# Set once Supabase reports the version column doesn't exist, so it's no longer requested.
+_version_column_missing = False
+
+
+def _version_column() -> str:
+    return "" if _version_column_missing else _PROFILE_VERSION_COLUMN
+
+
+def _is_missing_column(exc: Exception) -> bool:
+    # PostgreSQL's undefined_column, as passed through by PostgREST.
+    return getattr(exc, "code", None) == "42703" or "does not exist" in str(exc)
+
+
+def _select_profiles(client: Client, user_ids: List[str], columns: str) -> Any:
+    return resilience.call_sync(
+        "supabase",
+        lambda: client.table("profiles").select(columns).in_("id", user_ids).execute(),
+    )
+
+
+@timed("supabase")
+def _query_profiles(
+    user_ids: List[str], columns: str = _PROFILE_COLUMNS, versioned: bool = False
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    One ``id IN (...)`` query keyed by id; None when Supabase is unavailable or
+    errors. ``versioned`` also selects the version column while it exists.
+    """
+    global _version_column_missing
     client: Optional[Client] = safe_get_supabase_client()
     if client is None:
-        logger.error("Supabase client unavailable when fetching user %s", user_id)
+        logger.error("Supabase client unavailable when fetching %d users", len(user_ids))
         return None
 
+    version = _version_column() if versioned else ""
     try:
-        response = (
-            client.table("profiles")
-            .select(
-                "id, display_name, likes, vibes, tags, budget_max, distance_km_max"
-            )
-            .eq("id", user_id)
-            .single()
-            .execute()
-        )
-        return response.data
+        try:
+            response = _select_profiles(client, user_ids, f"{columns}, {version}" if version else columns)
+        except Exception as exc:  # pylint: disable=broad-except
+            if not version or not _is_missing_column(exc):
+                raise
+            logger.warning("profiles.%s does not exist; caching tastes without version checks.", version)
+            _version_column_missing = True
+            response = _select_profiles(client, user_ids, columns)
     except Exception as exc:  # pylint: disable=broad-except
-        logger.exception("Failed to fetch profile for user %s: %s", user_id, exc)
+        logger.exception("Failed to fetch profiles for users %s: %s", user_ids, exc)
         return None
+    return {str(row.get("id")): row for row in response.data or [] if row.get("id") is not None}
 
 
-def tool_get_user_taste(user_id: str, overrides: Optional[Dict[str, FriendOverride]] = None) -> UserTaste:
-    if overrides and user_id in overrides:
-        override = overrides[user_id]
-        return UserTaste(
-            user_id=override.user_id,
-            likes=list(override.likes),
-            vibes=list(override.vibes),
-            tags=list(override.tags),
-            budget_max=override.budget_max,
-            distance_km_max=override.distance_km_max,
-        )
+def _taste_from_override(override: FriendOverride) -> UserTaste:
+    return UserTaste(
+        user_id=override.user_id,
+        likes=list(override.likes),
+        vibes=list(override.vibes),
+        tags=list(override.tags),
+        budget_max=override.budget_max,
+        distance_km_max=override.distance_km_max,
+    )
+
+
+def _assemble_tastes(
+    user_ids: List[str],
+    overrides: Dict[str, FriendOverride],
+    found: Dict[str, UserTaste],
+) -> List[UserTaste]:
+    return [
+        _taste_from_override(overrides[uid]) if uid in overrides
+        else found.get(uid) or UserTaste(user_id=uid)
+        for uid in user_ids
+    ]
+
+
+def _load_tastes_through_cache(user_ids: List[str]) -> Tuple[Dict[str, UserTaste], List[str]]:
+    fresh, stale, absent = _taste_cache.lookup(user_ids)
+    to_fetch = list(absent)
+
+    if stale:
+        column = _version_column()
+        versions = _query_profiles(list(stale), "id", versioned=True) if column else {}
+        for uid, cached_version in stale.items():
+            if versions is None:
+                # Supabase is down; serve the stale copy rather than asking again.
+                taste = _taste_cache.peek(uid)
+            else:
+                current = (versions.get(uid) or {}).get(column) if column else None
+                taste = _taste_cache.renew(uid) if cached_version is not None and current == cached_version else None
+            if taste is not None:
+                fresh[uid] = taste
+            else:
+                to_fetch.append(uid)
+
+    missing: List[str] = []
+    if to_fetch:
+        records = _query_profiles(to_fetch, versioned=True)
+        for uid in to_fetch:
+            record = (records or {}).get(uid)
+            if record is None:
+                # Serve the stale copy rather than defaults if Supabase is down.
+                previous = _taste_cache.peek(uid) if records is None and uid in stale else None
+                if previous is not None:
+                    fresh[uid] = previous
+                else:
+                    missing.append(uid)
+                continue
+            taste = _taste_from_record(uid, record)
+            version = record.get(_PROFILE_VERSION_COLUMN) if _PROFILE_VERSION_COLUMN else None
+            _taste_cache.put(uid, taste, version, refetch=uid in stale)
+            fresh[uid] = taste
+    return fresh, missing
+
+
+@timed()
+async def tool_get_user_tastes_cached(
+    user_ids: List[str],
+    overrides: Optional[Dict[str, FriendOverride]] = None,
+) -> Tuple[List[UserTaste], List[str]]:
+    """
+    Batched taste loader behind the TTL/versioned taste cache: one profiles
+    query for the users it has to (re)read. Returns tastes in ``user_ids``
+    order plus the ids that had no profile row (those get default
+    preferences). Users with request overrides bypass the cache entirely
+    (and are never stored in it).
+    """
+    overrides = overrides or {}
+    lookup_ids = list(dict.fromkeys(uid for uid in user_ids if uid not in overrides))
+    if len(lookup_ids) < len(set(user_ids)):
+        _taste_cache.record_bypass(len(set(user_ids)) - len(lookup_ids))
+
+    found: Dict[str, UserTaste] = {}
+    missing: List[str] = []
+    if lookup_ids:
+        found, missing = await asyncio.to_thread(_load_tastes_through_cache, lookup_ids)
+    if missing:
+        logger.warning("No profile found for users %s; using default preferences.", missing)
+    return _assemble_tastes(user_ids, overrides, found), missing
+
 
-    record = _fetch_profile_from_supabase(user_id)
+def invalidate_user_taste(user_id: Optional[str] = None) -> int:
+    """Evict one user's cached taste (or all when None) after a profile edit."""
+    return _taste_cache.invalidate(user_id)
 
+
+def _taste_from_record(user_id: str, record: Optional[Dict[str, Any]]) -> UserTaste:
     if not record:
         logger.warning("No profile found for user %s; returning default preferences.", user_id)
         return UserTaste(user_id=user_id)
@@ -70,6 +218,7 @@ def tool_get_user_taste(user_id: str, overrides: Optional[Dict[str, FriendOverri
             return [str(v).strip() for v in value if v]
         return [str(value).strip()]
 
+    version = record.get(_PROFILE_VERSION_COLUMN) if _PROFILE_VERSION_COLUMN else None
     return UserTaste(
         user_id=str(record.get("id", user_id)),
         likes=_normalise_list(likes),
@@ -77,66 +226,49 @@ def tool_get_user_taste(user_id: str, overrides: Optional[Dict[str, FriendOverri
         tags=_normalise_list(tags),
         budget_max=record.get("budget_max"),
         distance_km_max=record.get("distance_km_max"),
+        version=str(version) if version is not None else None,
     )
 
+@timed()
 def tool_merge_tastes(tastes: List[UserTaste]) -> Dict[str, Any]:
-    # naive weighted union for hackathon speed
-    from collections import Counter
-
-    vibes = Counter(v for t in tastes for v in t.vibes).most_common()
-    merged_vibe = (vibes[0][0] if vibes else "chill")
-
-    budgets = [t.budget_max for t in tastes if t.budget_max is not None]
-    budget = min(budgets) if budgets else 30  # default to <$30 if unknown
-
-    distance_values = [t.distance_km_max for t in tastes if t.distance_km_max is not None]
-    distance = min(distance_values) if distance_values else 5
-
-    likes = list({l for t in tastes for l in t.likes})
-    tags = list({tg for t in tastes for tg in t.tags})
-    return {
-        "merged_vibe": merged_vibe,
-        "budget_cap": budget,
-        "distance_cap": distance,
-        "likes": likes,
-        "tags": tags,
-    }
-
-def _google_price_to_band(price_level: Optional[int]) -> Optional[str]:
-    mapping = {
-        0: "free",
-        1: "$",
-        2: "$$",
-        3: "$$$",
-        4: "$$$$",
-    }
-    return mapping.get(price_level) if price_level is not None else None
-
-
-def _budget_cap_to_price_level(budget_cap: Optional[float]) -> Optional[int]:
-    if budget_cap is None:
-        return None
-    if budget_cap <= 0:
-        return 0
-    if budget_cap <= 15:
-        return 1
-    if budget_cap <= 30:
-        return 2
-    if budget_cap <= 60:
-        return 3
-    return 4
-
-
-def _price_band_to_level(price: Optional[str]) -> Optional[int]:
-    if not price:
-        return None
-    normalized = price.lower()
-    if normalized == "free":
-        return 0
-    return normalized.count("$")
-
-
-def _geocode_location(location: Optional[str]) -> Optional[Tuple[float, float]]:
+    # Most common vibe, strictest budget/distance, union of likes and tags;
+    # memoized per (members, profile versions), see backend/taste_merge.py.
+    return _taste_merge.merge(tastes)
+
+_geocode_cache = TTLCache(
+    "geocode",
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL_S", str(30 * 24 * 3600))),
+    persist=True,
+)
+_GEOCODE_NEGATIVE_TTL_S = float(os.getenv("GEOCODE_NEGATIVE_TTL_S", str(24 * 3600)))
+
+# Eventbrite pagination: stop once this many usable events are in, never past MAX_PAGES.
+EVENTBRITE_TARGET_RESULTS = int(os.getenv("EVENTBRITE_TARGET_RESULTS", "40"))
+EVENTBRITE_MAX_PAGES = int(os.getenv("EVENTBRITE_MAX_PAGES", "5"))
+EVENTBRITE_PAGE_CONCURRENCY = int(os.getenv("EVENTBRITE_PAGE_CONCURRENCY", "3"))
+
+# Places grid search: at most MAX_SIDE x MAX_SIDE cells of about CELL_KM each.
+PLACES_GRID_MAX_SIDE = int(os.getenv("PLACES_GRID_MAX_SIDE", "3"))
+PLACES_GRID_CELL_KM = float(os.getenv("PLACES_GRID_CELL_KM", "2"))
+PLACES_GRID_CONCURRENCY = int(os.getenv("PLACES_GRID_CONCURRENCY", "4"))
+# Later pages cost a token-activation delay each, so they're only fetched for cells that came back full.
+PLACES_GRID_MAX_PAGES = int(os.getenv("PLACES_GRID_MAX_PAGES", "1"))
+PLACES_PAGE_TOKEN_DELAY_S = float(os.getenv("PLACES_PAGE_TOKEN_DELAY_S", "2"))
+# Overall budget for one grid search; cells still running then are dropped.
+PLACES_GRID_DEADLINE_S = float(os.getenv("PLACES_GRID_DEADLINE_S", "5"))
+_PLACES_PAGE_SIZE = 20
+
+# Cells already searched for the same keyword/filters, so repeat grid searches skip them.
+_grid_cell_cache = TTLCache(
+    "places_grid_cells",
+    maxsize=int(os.getenv("PLACES_GRID_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PLACES_GRID_CACHE_TTL_S", "900")),
+)
+_geocode_flight = SingleFlight("geocode")
+
+
+async def _geocode_location(location: Optional[str]) -> Optional[Tuple[float, float]]:
     if not location:
         return None
 
@@ -144,18 +276,35 @@ def _geocode_location(location: Optional[str]) -> Optional[Tuple[float, float]]:
     if not api_key:
         return None
 
+    cache_key = normalize_key(location)
+    cached = _geocode_cache.get(cache_key)
+    if cached is not MISS:
+        return tuple(cached) if cached else None
+
+    # Concurrent plans for the same place share one Geocoding request.
+    return await _geocode_flight.do(
+        cache_key, lambda: _lookup_geocode(location, api_key, cache_key), copy_result=False
+    )
+
+
+@timed("geocode")
+async def _lookup_geocode(location: str, api_key: str, cache_key: str) -> Optional[Tuple[float, float]]:
     try:
-        resp = httpx.get(
-            "https://maps.googleapis.com/maps/api/geocode/json",
+        resp = await _http_get(
+            "geocode",
+            f"{GOOGLE_MAPS_API_BASE}/maps/api/geocode/json",
             params={"address": location, "key": api_key},
-            timeout=10.0,
         )
-        resp.raise_for_status()
         data = resp.json()
         if data.get("results"):
             geometry = data["results"][0]["geometry"]["location"]
-            return geometry["lat"], geometry["lng"]
-        if data.get("status") != "OK":
+            coords = (geometry["lat"], geometry["lng"])
+            _geocode_cache.set(cache_key, list(coords))
+            return coords
+        if data.get("status") == "ZERO_RESULTS":
+            # Unknown address: remember the miss so we stop asking for it.
+            _geocode_cache.set(cache_key, None, ttl=_GEOCODE_NEGATIVE_TTL_S)
+        elif data.get("status") != "OK":
             logger.warning("Geocode lookup returned status %s", data.get("status"))
     except Exception as exc:
         logger.error("Geocode lookup failed: %s", exc)
@@ -164,6 +313,17 @@ def _geocode_location(location: Optional[str]) -> Optional[Tuple[float, float]]:
     return None
 
 
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the tool-layer caches, surfaced by /api/v1/stats."""
+    return {
+        "geocode": _geocode_cache.stats(),
+        "tastes": _taste_cache.stats(),
+        "taste_merge": _taste_merge.stats(),
+        "sentiment": sentiment.stats(),
+        "places_grid_cells": _grid_cell_cache.stats(),
+    }
+
+
 def _parse_time_window(time_window: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
     if not time_window:
         return None, None
@@ -219,67 +379,78 @@ def _parse_time_window(time_window: Optional[str]) -> Tuple[Optional[str], Optio
     return start_iso, end_iso
 
 
-def _fetch_google_places(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+@register_provider("google_places", ttl=900)
+async def _fetch_google_places(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     api_key = os.getenv("GOOGLE_PLACES_API_KEY")
     if not api_key:
         return get_tool_candidates("google_places", query)
 
-    coords = _geocode_location(query.get("location"))
+    coords = await _geocode_location(query.get("location"))
     radius_km = query.get("distance_cap") or 5
     radius_m = min(max(int(radius_km * 1000), 1000), 50000)
 
-    keyword_parts: List[str] = []
-    if query.get("vibe"):
-        keyword_parts.append(str(query["vibe"]))
-    keyword_parts.extend(query.get("likes") or [])
-    keyword_parts.extend(query.get("tags") or [])
-    keyword = " ".join(keyword_parts) or "activities"
+    keyword = _places_keyword(query)
 
-    price_level_cap = _budget_cap_to_price_level(query.get("budget_cap"))
+    price_level_cap = budget_cap_to_price_level(query.get("budget_cap"))
 
-    results: List[Dict[str, Any]] = []
     try:
-        with httpx.Client(timeout=10.0) as client:
-            if coords:
-                params = {
-                    "location": f"{coords[0]},{coords[1]}",
+        if coords:
+            params = {
+                "location": f"{coords[0]},{coords[1]}",
+                "radius": radius_m,
+                "keyword": keyword,
+                "key": api_key,
+                "language": "en",
+            }
+            if query.get("time_window"):
+                params["opennow"] = "true"
+            resp = await _http_get(
+                "google_places",
+                f"{GOOGLE_MAPS_API_BASE}/maps/api/place/nearbysearch/json",
+                params=params,
+            )
+        else:
+            resp = await _http_get(
+                "google_places",
+                f"{GOOGLE_MAPS_API_BASE}/maps/api/place/textsearch/json",
+                params={
+                    "query": f"{keyword} {query.get('location') or ''}".strip(),
                     "radius": radius_m,
-                    "keyword": keyword,
                     "key": api_key,
                     "language": "en",
-                }
-                if query.get("time_window"):
-                    params["opennow"] = "true"
-                resp = client.get(
-                    "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-                    params=params,
-                )
-            else:
-                resp = client.get(
-                    "https://maps.googleapis.com/maps/api/place/textsearch/json",
-                    params={
-                        "query": f"{keyword} {query.get('location') or ''}".strip(),
-                        "radius": radius_m,
-                        "key": api_key,
-                        "language": "en",
-                        "region": "us",
-                    },
-                )
-            resp.raise_for_status()
-            data = resp.json()
-            status = data.get("status")
-            if status not in {"OK", "ZERO_RESULTS"}:
-                logger.warning("Google Places returned status %s: %s", status, data.get("error_message"))
+                    "region": "us",
+                },
+            )
+        data = resp.json()
+        status = data.get("status")
+        if status not in {"OK", "ZERO_RESULTS"}:
+            logger.warning("Google Places returned status %s: %s", status, data.get("error_message"))
     except Exception as exc:
         logger.error("Google Places fetch failed: %s", exc)
         return []
 
-    for place in data.get("results", [])[:20]:
+    return _place_candidates(data.get("results", [])[:20], query, price_level_cap)
+
+
+def _places_keyword(query: Dict[str, Any]) -> str:
+    keyword_parts: List[str] = []
+    if query.get("vibe"):
+        keyword_parts.append(str(query["vibe"]))
+    keyword_parts.extend(query.get("likes") or [])
+    keyword_parts.extend(query.get("tags") or [])
+    return " ".join(keyword_parts) or "activities"
+
+
+def _place_candidates(
+    places: List[Dict[str, Any]], query: Dict[str, Any], price_level_cap: Optional[int]
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for place in places:
         geometry = place.get("geometry", {}).get("location", {})
-        price_band = _google_price_to_band(place.get("price_level")) or "unknown"
+        price_band = google_price_to_band(place.get("price_level")) or "unknown"
 
         if price_level_cap is not None:
-            level = _price_band_to_level(price_band)
+            level = price_band_to_level(price_band)
             if level is not None and level > price_level_cap:
                 continue
 
@@ -292,6 +463,7 @@ def _fetch_google_places(query: Dict[str, Any]) -> List[Dict[str, Any]]:
                 "lat": geometry.get("lat"),
                 "lng": geometry.get("lng"),
                 "distance_km": None,
+                "place_id": place.get("place_id"),
                 "booking_url": place.get("website")
                 or f"https://maps.google.com/?q={place.get('place_id')}",
                 "maps_url": f"https://www.google.com/maps/search/?api=1&query={geometry.get('lat')},{geometry.get('lng')}",
@@ -305,12 +477,13 @@ def _fetch_google_places(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     return results
 
 
-def _fetch_eventbrite_events(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+@register_provider("eventbrite", ttl=300)
+async def _fetch_eventbrite_events(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     token = os.getenv("EVENTBRITE_API_KEY")
     if not token:
         return get_tool_candidates("eventbrite", query)
 
-    coords = _geocode_location(query.get("location"))
+    coords = await _geocode_location(query.get("location"))
     start_iso, end_iso = _parse_time_window(query.get("time_window"))
 
     search_terms: List[str] = []
@@ -370,21 +543,25 @@ def _fetch_eventbrite_events(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     if end_iso:
         params["start_date.range_end"] = end_iso
 
-    def _query_eventbrite(search_params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Pages after the first reuse whichever params worked (e.g. the address fallback)
+    # and never switch strategy themselves.
+    effective = {"params": params}
+
+    async def _query_eventbrite(search_params: Dict[str, Any], fallback: bool = False) -> Optional[Dict[str, Any]]:
+        # ``fallback`` marks a query that must not fall back to the address again.
         try:
-            resp = httpx.get(
-                "https://www.eventbriteapi.com/v3/events/search/",
+            resp = await _http_get(
+                "eventbrite",
+                f"{EVENTBRITE_API_BASE}/v3/events/search/",
                 params=search_params,
                 headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0,
             )
-            resp.raise_for_status()
             data = resp.json()
             if data.get("error_description"):
                 logger.warning("Eventbrite error: %s", data["error_description"])
             return data
         except httpx.HTTPStatusError as exc:
-            if exc.response.status_code == 404 and not use_address_fallback and query.get("location"):
+            if exc.response.status_code == 404 and not fallback and not use_address_fallback and query.get("location"):
                 # Retry with address fallback if coordinates caused an error
                 fallback_params = dict(search_params)
                 fallback_params.pop("location.latitude", None)
@@ -392,110 +569,242 @@ def _fetch_eventbrite_events(query: Dict[str, Any]) -> List[Dict[str, Any]]:
                 fallback_params.pop("location.within", None)
                 fallback_params["location.address"] = query["location"]
                 logger.info("Eventbrite 404 with coordinates; retrying with address fallback.")
-                return _query_eventbrite(fallback_params)
+                effective["params"] = {k: v for k, v in fallback_params.items() if k != "page"}
+                return await _query_eventbrite(fallback_params, fallback=True)
             logger.error("Eventbrite fetch failed with status %s: %s", exc.response.status_code, exc)
             return None
         except Exception as exc:
             logger.error("Eventbrite fetch failed: %s", exc)
             return None
 
-    data = _query_eventbrite(params)
+    data = await _query_eventbrite(params)
     if not data:
         return []
 
-    events: List[Dict[str, Any]] = []
-    for event in data.get("events", []):
-        venue = event.get("venue") or {}
-        category = event.get("category", {})
-        is_free = event.get("is_free", False)
-        events.append(
-            {
-                "title": event.get("name", {}).get("text"),
-                "vibe": query.get("vibe") or (category.get("short_name") if category else None),
-                "price": "free" if is_free else "$$",
-                "address": venue.get("address", {}).get("localized_address_display"),
-                "lat": venue.get("latitude"),
-                "lng": venue.get("longitude"),
-                "distance_km": None,
-                "booking_url": event.get("url"),
-                "source": "eventbrite",
-                "tags": [category.get("short_name")] if category else [],
-                "summary": event.get("summary") or event.get("description", {}).get("text"),
-                "maps_url": (
-                    f"https://www.google.com/maps/search/?api=1&query={venue.get('latitude')},{venue.get('longitude')}"
-                    if venue.get("latitude") and venue.get("longitude")
-                    else None
-                ),
-            }
+    raw_events: List[Dict[str, Any]] = list(data.get("events", []))
+    usable = sum(_eventbrite_usable(e, budget_cap, start_iso, end_iso) for e in raw_events)
+    pagination = data.get("pagination") or {}
+    page_count = min(int(pagination.get("page_count") or 1), EVENTBRITE_MAX_PAGES)
+    next_page = 2
+    # Fetch further pages a few at a time; stop once enough usable events are in.
+    while usable < EVENTBRITE_TARGET_RESULTS and next_page <= page_count:
+        wave = range(next_page, min(next_page + EVENTBRITE_PAGE_CONCURRENCY, page_count + 1))
+        pages = await asyncio.gather(
+            *(_query_eventbrite({**effective["params"], "page": page}, fallback=True) for page in wave)
         )
-    return events
+        next_page = wave.stop
+        for page_data in pages:
+            page_events = (page_data or {}).get("events", [])
+            raw_events.extend(page_events)
+            usable += sum(_eventbrite_usable(e, budget_cap, start_iso, end_iso) for e in page_events)
+    if next_page > 2:
+        logger.info("Eventbrite: %d events from %d pages (%d usable)", len(raw_events), next_page - 1, usable)
+
+    return [_eventbrite_candidate(event, query) for event in raw_events]
+
+
+def _eventbrite_usable(
+    event: Dict[str, Any], budget_cap: Optional[float], start_iso: Optional[str], end_iso: Optional[str]
+) -> bool:
+    """Whether an event fits the budget and time window (counts toward the early stop)."""
+    if budget_cap is not None and budget_cap <= 0 and not event.get("is_free"):
+        return False
+    start = ((event.get("start") or {}).get("utc") or "")[:19]
+    # Same-format ISO-8601 timestamps compare correctly as text.
+    if start and start_iso and start < start_iso[:19]:
+        return False
+    if start and end_iso and start > end_iso[:19]:
+        return False
+    return True
+
+
+def _eventbrite_candidate(event: Dict[str, Any], query: Dict[str, Any]) -> Dict[str, Any]:
+    venue = event.get("venue") or {}
+    category = event.get("category", {})
+    is_free = event.get("is_free", False)
+    return {
+        "id": event.get("id"),
+        "title": event.get("name", {}).get("text"),
+        "vibe": query.get("vibe") or (category.get("short_name") if category else None),
+        "price": "free" if is_free else "$$",
+        "address": venue.get("address", {}).get("localized_address_display"),
+        "lat": venue.get("latitude"),
+        "lng": venue.get("longitude"),
+        "distance_km": None,
+        "booking_url": event.get("url"),
+        "source": "eventbrite",
+        "tags": [category.get("short_name")] if category else [],
+        "summary": event.get("summary") or event.get("description", {}).get("text"),
+        "maps_url": (
+            f"https://www.google.com/maps/search/?api=1&query={venue.get('latitude')},{venue.get('longitude')}"
+            if venue.get("latitude") and venue.get("longitude")
+            else None
+        ),
+    }
+
+
+async def _finalize_candidates(pool: List[Dict[str, Any]], query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    candidates = dedupe_candidates(pool, query.get("location"))
+    # Providers already geocoded this location, so the origin comes from cache.
+    origin = await _geocode_location(query.get("location")) if candidates else None
+    return apply_distances(candidates, origin, query.get("distance_cap"))
 
 
-def tool_find_activities(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+@timed()
+async def tool_find_activities(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Input keys (example): {
       "location": "Cambridge, MA", "vibe": "outdoors", "budget_cap": 20,
       "time_window": "today 4-8pm", "likes": ["sunset","live music"], "tags":["free"]
     }
     Return raw candidates; Writer will turn into PlanCard.
+    All registered providers are queried concurrently; candidates get
+    ``distance_km`` from the geocoded location and those beyond
+    ``distance_cap`` are dropped.
     """
-    google_results = _fetch_google_places(query)
-    event_results = _fetch_eventbrite_events(query)
+    provider_results = await fetch_all_providers(query)
+    return await _finalize_candidates([r for results in provider_results.values() for r in results], query)
 
-    combined_map: Dict[str, Dict[str, Any]] = {}
-    for item in google_results + event_results:
-        key = f"{item.get('title','').lower()}::{item.get('address','').lower()}"
-        combined_map[key] = item
 
-    return list(combined_map.values())
-
-# === Inspired extensions (stubs for agentic flow) ===
-
-@lru_cache(maxsize=512)
-def tool_get_user_taste_cached(user_id: str, overrides: Optional[Dict[str, FriendOverride]] = None) -> UserTaste:
+async def tool_stream_activities(query: Dict[str, Any]) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
     """
-    Lightweight in-process cache for user tastes.
-    Replace with Supabase row fetch + HTTP cache headers.
+    Like ``tool_find_activities`` but yields ``(provider, candidates so far)``
+    each time a provider answers, for streaming plans.
     """
-    if overrides:
-        return tool_get_user_taste(user_id, overrides=overrides)
-    return tool_get_user_taste(user_id)
+    pool: List[Dict[str, Any]] = []
+    async for name, results in iter_providers(query):
+        pool.extend(results)
+        yield name, await _finalize_candidates(list(pool), query)
 
+# === Agentic tools: grid search and sentiment; calendar and reservations are still stubs ===
 
-def tool_search_places_grid(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+@timed()
+async def tool_search_places_grid(query: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
-    Grid-style expansion for dense urban discovery.
-    For demo: call the same finder, but tag results to indicate grid search.
+    Grid-style expansion for dense urban discovery. A single Nearby Search
+    tops out at 60 places around one point, so the ``distance_cap`` circle
+    around the origin is tiled into cells that are searched concurrently,
+    merged by ``place_id`` and tagged "grid". Cells still searching after
+    ``PLACES_GRID_DEADLINE_S`` are dropped. Cells searched recently for the
+    same keyword come from cache.
     """
-    base = tool_find_activities(query)
-    for r in base:
+    api_key = os.getenv("GOOGLE_PLACES_API_KEY")
+    origin = await _geocode_location(query.get("location")) if api_key else None
+    if not api_key or origin is None:
+        # Without a key or an origin there is nothing to tile; use the single-shot source.
+        found = await _fetch_google_places(query)
+    else:
+        radius_km = float(query.get("distance_cap") or 5)
+        centres, cell_radius_km = tile_circle(origin, radius_km, PLACES_GRID_MAX_SIDE, PLACES_GRID_CELL_KM)
+        cell_radius_m = min(max(int(cell_radius_km * 1000), 500), 50000)
+        limit = asyncio.Semaphore(PLACES_GRID_CONCURRENCY)
+
+        async def search_cell(centre: Tuple[float, float]) -> List[Dict[str, Any]]:
+            async with limit:
+                return await _places_grid_cell(centre, cell_radius_m, query, api_key)
+
+        tasks = [asyncio.ensure_future(search_cell(c)) for c in centres]
+        done, pending = await asyncio.wait(tasks, timeout=PLACES_GRID_DEADLINE_S)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        by_place: Dict[str, Dict[str, Any]] = {}
+        # Task order, not completion order, so the merge is deterministic.
+        for task in tasks:
+            if task not in done:
+                continue
+            for candidate in task.result():
+                by_place.setdefault(candidate.get("place_id") or candidate.get("title") or "", candidate)
+        found = list(by_place.values())
+        tracing.set_attribute("grid.cells_timed_out", len(pending))
+        logger.info(
+            "Places grid: %d/%d cells within %.1fs, %d unique places",
+            len(done), len(centres), PLACES_GRID_DEADLINE_S, len(found),
+        )
+
+    for r in found:
         r.setdefault("tags", [])
         if "grid" not in r["tags"]:
             r["tags"].append("grid")
-    return base
+    return await _finalize_candidates(found, query)
+
+
+async def _places_grid_cell(
+    centre: Tuple[float, float], radius_m: int, query: Dict[str, Any], api_key: str
+) -> List[Dict[str, Any]]:
+    keyword = _places_keyword(query)
+    open_now = bool(query.get("time_window"))
+    price_level_cap = budget_cap_to_price_level(query.get("budget_cap"))
+    cell_key = normalize_key(
+        f"{centre[0]:.4f},{centre[1]:.4f}|{radius_m}|{keyword}|{open_now}|{price_level_cap}|{query.get('vibe')}"
+    )
+    cached = _grid_cell_cache.get(cell_key)
+    if cached is not MISS:
+        return copy.deepcopy(cached)
+
+    params: Dict[str, Any] = {
+        "location": f"{centre[0]},{centre[1]}",
+        "radius": radius_m,
+        "keyword": keyword,
+        "key": api_key,
+        "language": "en",
+    }
+    if open_now:
+        params["opennow"] = "true"
+
+    places: List[Dict[str, Any]] = []
+    url = f"{GOOGLE_MAPS_API_BASE}/maps/api/place/nearbysearch/json"
+    try:
+        for page in range(PLACES_GRID_MAX_PAGES):
+            resp = await _http_get("google_places", url, params=params)
+            data = resp.json()
+            status = data.get("status")
+            if status == "INVALID_REQUEST" and page > 0:
+                # A fresh next_page_token isn't valid for a couple of seconds.
+                await asyncio.sleep(PLACES_PAGE_TOKEN_DELAY_S)
+                resp = await _http_get("google_places", url, params=params)
+                data = resp.json()
+                status = data.get("status")
+            if status not in {"OK", "ZERO_RESULTS"}:
+                logger.warning("Google Places grid cell returned status %s: %s", status, data.get("error_message"))
+                break
+            results = data.get("results", [])
+            places.extend(results)
+            token = data.get("next_page_token")
+            if not token or len(results) < _PLACES_PAGE_SIZE or page + 1 >= PLACES_GRID_MAX_PAGES:
+                break
+            params = {"pagetoken": token, "key": api_key}
+            await asyncio.sleep(PLACES_PAGE_TOKEN_DELAY_S)
+    except Exception as exc:
+        logger.error("Google Places grid cell fetch failed: %s", exc)
+        return _place_candidates(places, query, price_level_cap)
+
+    candidates = _place_candidates(places, query, price_level_cap)
+    _grid_cell_cache.set(cell_key, copy.deepcopy(candidates))
+    return candidates
 
 
+@timed()
 def tool_sentiment_enrich(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Stub sentiment enrichment. In production, aggregate reviews/social posts and
-    attach sentiment facets. Here we just add a neutral sentiment flag.
+    Attach a ``sentiment`` facet (overall label, score, confidence) scored
+    locally from review and summary text; venues are cached across plans.
+    Candidates are updated in place.
     """
-    enriched: List[Dict[str, Any]] = []
-    for c in candidates:
-        item = dict(c)
-        item["sentiment"] = {"overall": "neutral", "confidence": 0.6}
-        enriched.append(item)
-    return enriched
+    return sentiment.enrich(candidates)
 
 
-def tool_calendar_probe(user_ids: List[str], time_window: Optional[str]) -> Dict[str, Any]:
+@timed()
+async def tool_calendar_probe(user_ids: List[str], time_window: Optional[str]) -> Dict[str, Any]:
     """
     Stub calendar probe. In production, query Google Calendar/Outlook with OAuth.
     """
     return {"availability": "unknown", "users": user_ids, "time_window": time_window}
 
 
-def tool_reserve_table(candidate: Dict[str, Any]) -> Dict[str, Any]:
+@timed()
+async def tool_reserve_table(candidate: Dict[str, Any]) -> Dict[str, Any]:
     """
     Stub reservation hook. In production, integrate with OpenTable/inline or call venue.
     """
@@ -0,0 +1,302 @@
+"""
+Per-request trace spans, OpenTelemetry-style.
+
+``orchestrator.plan`` opens a root span for each sampled request. Every
+``metrics.stage`` opens a child span: agent passes, agentic controller
+steps, ``tool_*`` calls, geocode, Supabase and Gemini. Providers and
+upstream HTTP attempts get their own spans as well. Code on the hot path
+annotates the current span with ``set_attribute``: provider, cache outcome,
+result count, retries and HTTP status.
+
+Sampling is decided once per request. ``TRACE_SAMPLE_RATE`` defaults to 0,
+which turns tracing off. An incoming W3C ``traceparent`` header with the
+sampled flag, or ``"debug": true`` in the request, forces a trace.
+Unsampled requests only pay for a context-variable lookup per stage.
+
+Finished traces are exported by a background thread, off the event loop.
+The default exporter appends one JSON object per span to ``TRACE_FILE``.
+``TRACE_EXPORTER=otlp`` instead posts OTLP/HTTP JSON to
+``TRACE_OTLP_ENDPOINT`` (e.g. an OpenTelemetry Collector on :4318).
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(".cache", "traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "1000"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "vivi-planner")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class _Trace:
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.exported = False
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]]) -> None:
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        # Spans ending after their trace was exported (e.g. background refreshes) are dropped.
+        if not self.trace.exported:
+            self.trace.spans.append(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end_ns = self.end_ns or self.start_ns
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+# (trace id, parent span id, sampled) from an incoming ``traceparent`` header.
+_remote_parent: ContextVar[Optional[Tuple[str, str, bool]]] = ContextVar("trace_remote_parent", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+@contextmanager
+def remote_parent(traceparent: Optional[str]) -> Iterator[None]:
+    """Make traces started inside this block children of the caller's ``traceparent``."""
+    token = _remote_parent.set(parse_traceparent(traceparent))
+    try:
+        yield
+    finally:
+        _remote_parent.reset(token)
+
+
+def _close(span: Span, token: Token, exc: Optional[BaseException]) -> None:
+    if exc is not None:
+        span.status = "error"
+        span.attributes.setdefault("error.type", type(exc).__name__)
+    span.end()
+    _current.reset(token)
+
+
+@contextmanager
+def trace(name: str, force: bool = False, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """
+    Root span for one request, exported when it ends. Yields None when the
+    request isn't sampled; nested inside an active trace it is a plain child span.
+    """
+    if _current.get() is not None:
+        with span(name, attributes) as child:
+            yield child
+        return
+
+    remote = _remote_parent.get()
+    sampled = force or (remote[2] if remote else random.random() < TRACE_SAMPLE_RATE)
+    if not sampled:
+        yield None
+        return
+
+    trace_id, parent_id = remote[:2] if remote else (f"{random.getrandbits(128):032x}", None)
+    root = Span(_Trace(trace_id), name, parent_id, attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as exc:
+        _close(root, token, exc)
+        raise
+    else:
+        _close(root, token, None)
+    finally:
+        root.trace.exported = True
+        _exporter().submit(root.trace.spans)
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """Child of the current span; a no-op yielding None outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        _close(child, token, exc)
+        raise
+    _close(child, token, None)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Annotate the current span, if this request is being traced."""
+    current = _current.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON (``ExportTraceServiceRequest``) for one batch of spans."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": s.trace.trace_id,
+                                "spanId": s.span_id,
+                                "parentSpanId": s.parent_id or "",
+                                "name": s.name,
+                                "kind": 1,
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                                "status": {"code": 2 if s.status == "error" else 1},
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class _Exporter:
+    """Queue drained by a daemon thread that writes or posts finished traces."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self.traces = 0
+        self.spans = 0
+        self.dropped = 0
+        self.failures = 0
+        self._client: Optional[httpx.Client] = None
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def submit(self, spans: List[Span]) -> None:
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            spans = self.queue.get()
+            try:
+                self._export(spans)
+                self.traces += 1
+                self.spans += len(spans)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.failures += 1
+                logger.warning("Trace export failed: %s", exc)
+            finally:
+                self.queue.task_done()
+
+    def _export(self, spans: List[Span]) -> None:
+        if self.kind == "otlp":
+            if self._client is None:
+                self._client = httpx.Client(timeout=5.0)
+            self._client.post(f"{TRACE_OTLP_ENDPOINT}/v1/traces", json=to_otlp(spans)).raise_for_status()
+            return
+        directory = os.path.dirname(TRACE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(TRACE_FILE, "a", encoding="utf-8") as fh:
+            for s in spans:
+                fh.write(json.dumps(s.to_dict(), default=str) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exporter": self.kind,
+            "traces": self.traces,
+            "spans": self.spans,
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+_exporter_instance: Optional[_Exporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter() -> _Exporter:
+    global _exporter_instance
+    with _exporter_lock:
+        if _exporter_instance is None:
+            _exporter_instance = _Exporter(TRACE_EXPORTER)
+        return _exporter_instance
+
+
+def flush(timeout: float = 5.0) -> None:
+    """Wait (up to ``timeout``) for queued traces to be exported."""
+    if _exporter_instance is None:
+        return
+    deadline = time.monotonic() + timeout
+    while _exporter_instance.queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def tracing_stats() -> Dict[str, Any]:
+    stats = _exporter_instance.stats() if _exporter_instance is not None else {"exporter": TRACE_EXPORTER}
+    return {"sample_rate": TRACE_SAMPLE_RATE, **stats}
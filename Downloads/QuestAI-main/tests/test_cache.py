@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+from backend.cache import MISS, TTLCache, _SQLiteStore
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(key for (key,) in conn.execute("SELECT key FROM cache_entries"))
+
+
+def test_prune_deletes_only_expired_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = _SQLiteStore(path)
+    now = time.time()
+    store.set("ns", "old", 1, now - 10)
+    store.set("ns", "live", 2, now + 60)
+    store.flush()
+    assert _rows(path) == ["live", "old"]
+
+    assert store.prune() == 1
+    assert _rows(path) == ["live"]
+
+
+def test_store_opens_pruned(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = _SQLiteStore(path)
+    store.set("ns", "old", 1, time.time() - 10)
+    store.flush()
+
+    _SQLiteStore(path)
+    assert _rows(path) == []
+
+
+def test_load_skips_expired_rows(tmp_path):
+    store = _SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    now = time.time()
+    store.set("ns", "old", 1, now - 10)
+    store.set("ns", "live", {"a": 1}, now + 60)
+    store.set("other", "live", 3, now + 60)
+    store.flush()
+    assert [(key, value) for key, value, _ in store.load("ns", 10)] == [("live", {"a": 1})]
+
+
+def test_persistent_cache_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = TTLCache("geo", persist=True, path=path)
+    first.set("boston", [42.36, -71.06])
+    first.set("gone", [0, 0], ttl=-1)
+    first._store().flush()
+
+    second = TTLCache("geo", persist=True, path=path)
+    assert second.get("boston") == [42.36, -71.06]
+    assert second.get("gone") is MISS
+
+
+def test_store_opens_on_first_use(tmp_path):
+    path = tmp_path / "sub" / "cache.sqlite3"
+    cache = TTLCache("lazy", persist=True, path=str(path))
+    assert not path.parent.exists()
+    cache.get("anything")
+    assert path.exists()
@@ -0,0 +1,54 @@
+import json
+
+from backend.controller_state import encode_state, estimate_tokens
+from backend.schemas import UserTaste
+
+
+def _state(observations, query="something chill tonight"):
+    tastes = [
+        UserTaste(user_id=f"u{i}", vibes=["chill", f"vibe{i}"], likes=[f"like{i}-{j}" for j in range(10)],
+                  tags=[f"tag{i}"], budget_max=20 + i, distance_km_max=5)
+        for i in range(12)
+    ]
+    return {
+        "query": query,
+        "listener": {"primary_vibes": ["chill"], "time_hint": "tonight"},
+        "tastes": tastes,
+        "merged": {"vibe": "chill", "budget_cap": 20, "location": "Cambridge, MA",
+                   "likes": [f"like{j}" for j in range(30)], "tags": ["jazz", "outdoor"]},
+        "raw_candidates": [{}] * 40,
+        "observations": list(observations),
+    }
+
+
+def test_small_state_is_sent_whole():
+    state = _state(["Loaded 12 tastes"])
+    payload = json.loads(encode_state(state, token_budget=2000))
+    assert payload["query"] == "something chill tonight"
+    assert payload["group"]["size"] == 12
+    assert payload["new_observations"] == ["Loaded 12 tastes"]
+    assert payload["candidates"] == 40
+
+
+def test_only_new_observations_are_sent():
+    state = _state(["first", "second"])
+    encode_state(state)
+    state["observations"].append("third")
+    assert json.loads(encode_state(state))["new_observations"] == ["third"]
+
+
+def test_budget_is_a_hard_limit():
+    state = _state(["x" * 3000, "y" * 3000], query="q" * 2000)
+    for budget in (60, 150, 400):
+        text = encode_state(dict(state), extra={"replan_reason": "z" * 1000}, token_budget=budget)
+        assert estimate_tokens(text) <= budget
+        payload = json.loads(text)
+        # The newest observation survives, clipped, rather than being dropped.
+        assert payload["new_observations"][0].startswith("y")
+
+
+def test_reducers_keep_the_essentials():
+    text = encode_state(_state(["o" * 400] * 10), token_budget=150)
+    payload = json.loads(text)
+    assert payload["merged"]["budget_cap"] == 20
+    assert payload["candidates"] == 40
@@ -0,0 +1,72 @@
+from backend.dedup import dedupe_candidates, noise_tokens, title_fingerprint
+from backend.geo import geohash_cell, geohash_cell_size
+
+
+def _across_cell_edge():
+    """Two points ~2 m apart that fall in adjacent geohash cells."""
+    dlat, _ = geohash_cell_size(7)
+    row, _ = geohash_cell(42.3736, -71.1097)
+    edge = (row + 1) * dlat - 90.0
+    return (edge - 0.00001, -71.1097), (edge + 0.00001, -71.1097)
+
+
+def test_neighbouring_cells_merge_similar_titles():
+    south, north = _across_cell_edge()
+    assert geohash_cell(*south) != geohash_cell(*north)
+    candidates = [
+        {"source": "google_places", "place_id": "p1", "title": "Lamplighter Brewing Co.",
+         "lat": south[0], "lng": south[1], "tags": ["beer"]},
+        {"source": "eventbrite", "id": "e1", "title": "Lamplighter Brewing",
+         "lat": north[0], "lng": north[1], "tags": ["trivia"], "booking_url": "https://example.com/e1"},
+    ]
+    kept = dedupe_candidates(candidates)
+    assert len(kept) == 1
+    assert kept[0]["place_id"] == "p1"
+    assert kept[0]["tags"] == ["beer", "trivia"]
+    assert kept[0]["booking_url"] == "https://example.com/e1"
+    assert kept[0]["also_on"] == ["eventbrite"]
+
+
+def test_distant_or_different_titles_stay_separate():
+    south, _ = _across_cell_edge()
+    far = (south[0] + 0.01, south[1])
+    candidates = [
+        {"source": "a", "id": "1", "title": "Lamplighter Brewing", "lat": south[0], "lng": south[1]},
+        {"source": "b", "id": "2", "title": "Lamplighter Brewing", "lat": far[0], "lng": far[1]},
+        {"source": "c", "id": "3", "title": "Cambridge Public Library", "lat": south[0], "lng": south[1]},
+    ]
+    assert [c["id"] for c in dedupe_candidates(candidates)] == ["1", "2", "3"]
+
+
+def test_candidates_without_coordinates_match_on_address_and_fingerprint():
+    candidates = [
+        {"source": "a", "id": "1", "title": "The Brattle Theatre", "address": "40 Brattle St"},
+        {"source": "b", "id": "2", "title": "Brattle Theatre", "address": " 40 BRATTLE ST"},
+        {"source": "c", "id": "3", "title": "Brattle Theatre", "address": "1 Other St"},
+    ]
+    assert [c["id"] for c in dedupe_candidates(candidates)] == ["1", "3"]
+
+
+def test_same_provider_id_always_merges():
+    candidates = [
+        {"source": "google_places", "place_id": "p1", "title": "Cafe Luna"},
+        {"source": "google_places", "place_id": "p1", "title": "Luna Cafe & Bakery", "price": "$$"},
+    ]
+    kept = dedupe_candidates(candidates)
+    assert len(kept) == 1
+    assert kept[0]["price"] == "$$"
+
+
+def test_location_words_are_noise():
+    noise = noise_tokens("Cambridge, MA")
+    assert {"cambridge", "ma", "the"} <= noise
+    assert title_fingerprint("Harvest Cambridge", noise) == frozenset({"harvest"})
+    # A title made only of noise keeps its tokens rather than fingerprinting as empty.
+    assert title_fingerprint("The Cambridge", noise) == frozenset({"the", "cambridge"})
+
+    candidates = [
+        {"source": "a", "id": "1", "title": "Harvest", "address": "44 Brattle St"},
+        {"source": "b", "id": "2", "title": "Harvest Cambridge", "address": "44 Brattle St"},
+    ]
+    assert len(dedupe_candidates(candidates)) == 2
+    assert len(dedupe_candidates(candidates, location="Cambridge, MA")) == 1
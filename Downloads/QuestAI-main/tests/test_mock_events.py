@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from backend import mock_events
+from backend.mock_events import ActivityCatalog, time_window_bounds
+
+
+def _item(n, title, city="Cambridge", start=None, **extra):
+    return {
+        "id": f"t-{n}",
+        "title": title,
+        "source": extra.pop("source", "google_places"),
+        "city": city,
+        "vibes": extra.pop("vibes", []),
+        "tags": extra.pop("tags", []),
+        "start_time": start.isoformat() if start else None,
+        **extra,
+    }
+
+
+def _titles(catalog, mask):
+    return sorted(catalog.items[i]["title"] for i in mock_events._iter_bits(mask))
+
+
+def test_select_intersects_dense_and_sparse_postings():
+    # 130 items make "jazz" a bitmap posting and the one-off "yoga" an id array.
+    items = [_item(n, f"jazz night {n}", city="Boston" if n % 2 else "Cambridge") for n in range(128)]
+    items.append(_item(200, "rooftop jazz", city="Cambridge"))
+    items.append(_item(201, "rooftop yoga", city="Cambridge"))
+    catalog = ActivityCatalog(items)
+
+    assert isinstance(catalog.text._postings["jazz"], int)
+    assert not isinstance(catalog.text._postings["yoga"], int)
+    assert _titles(catalog, catalog.select(q="jazz yoga")) == []
+    assert _titles(catalog, catalog.select(q="rooftop yoga")) == ["rooftop yoga"]
+    assert _titles(catalog, catalog.select(q="rooftop jazz")) == ["rooftop jazz"]
+    assert _titles(catalog, catalog.select(q="rooftop", location="cambridge")) == ["rooftop jazz", "rooftop yoga"]
+    assert catalog.select(q="jazz", location="boston") == catalog.select(location="boston")
+    assert catalog.select(q="rooftop salsa") == 0
+
+
+def test_location_miss_is_strict_unless_relaxed():
+    catalog = ActivityCatalog([_item(0, "museum"), _item(1, "park", city="Somerville")])
+    assert catalog.select(location="denver") == 0
+    assert catalog.select(location="denver", strict_location=False) == catalog.all_bits
+
+
+def test_time_window_cuts_by_start_and_keeps_untimed_venues():
+    now = datetime(2026, 10, 14, 12, 0)  # a Wednesday
+    start, end = time_window_bounds("tonight", now=now)
+    assert datetime.fromtimestamp(start) == datetime(2026, 10, 14, 17, 0)
+    assert datetime.fromtimestamp(end) == datetime(2026, 10, 15, 3, 0)
+
+    catalog = ActivityCatalog([
+        _item(0, "lunch talk", start=now),
+        _item(1, "evening show", start=now.replace(hour=20)),
+        _item(2, "late set", start=now + timedelta(days=1, hours=-10)),
+        _item(3, "next day market", start=now + timedelta(days=1)),
+        _item(4, "bookshop"),
+    ])
+    window = catalog._time_bits(start, end) | catalog.untimed_bits
+    assert _titles(catalog, window) == ["bookshop", "evening show", "late set"]
+
+    saturday, _ = time_window_bounds("this weekend", now=now)
+    assert datetime.fromtimestamp(saturday) == datetime(2026, 10, 17, 0, 0)
+    assert time_window_bounds("someday", now=now) is None
+
+
+def test_seed_catalog_is_re_dated_each_day(monkeypatch):
+    monkeypatch.setattr(mock_events, "MOCK_EVENTS_PATH", None)
+    monkeypatch.setattr(mock_events, "_catalog", None)
+    monkeypatch.setattr(mock_events, "_catalog_day", None)
+    shift = {"days": 0}
+
+    class ShiftedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=shift["days"])
+
+    monkeypatch.setattr(mock_events, "datetime", ShiftedDatetime)
+
+    def earliest_start(catalog):
+        return min(item["start_time"] for item in catalog.items if item["start_time"])
+
+    first = mock_events.get_catalog()
+    assert mock_events.get_catalog() is first
+
+    shift["days"] = 1
+    second = mock_events.get_catalog()
+    assert second is not first
+    assert datetime.fromisoformat(earliest_start(second)) - datetime.fromisoformat(earliest_start(first)) == timedelta(days=1)
+
+
+def test_set_catalog_keeps_fixed_dates(monkeypatch):
+    monkeypatch.setattr(mock_events, "_catalog", None)
+    monkeypatch.setattr(mock_events, "_catalog_day", None)
+    catalog = mock_events.set_catalog([_item(0, "fixed", start=datetime(2020, 1, 1, 19))])
+
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=1)
+
+    monkeypatch.setattr(mock_events, "datetime", Tomorrow)
+    assert mock_events.get_catalog() is catalog
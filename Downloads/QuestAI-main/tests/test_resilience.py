@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend import resilience
+from backend.resilience import Policy, TokenBucket
+
+
+@pytest.fixture
+def make_policy(monkeypatch):
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt: 0.0)
+
+    def make(name, **env):
+        for key, value in env.items():
+            monkeypatch.setenv(f"RESILIENCE_{name.upper()}_{key}", str(value))
+        p = Policy(name)
+        monkeypatch.setitem(resilience._policies, name, p)
+        return p
+
+    return make
+
+
+def _timeout():
+    raise httpx.ConnectTimeout("slow upstream")
+
+
+def test_rate_limits_are_opt_in(make_policy):
+    assert make_policy("unlimited").bucket.rate == 0
+    limited = make_policy("limited", RPS=4)
+    assert limited.bucket.rate == 4
+    assert limited.bucket.capacity == 4
+
+
+def test_bucket_does_not_take_a_token_it_would_wait_too_long_for():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    assert bucket.reserve(max_wait=0.5) == 0.0
+    assert bucket.reserve(max_wait=0.5) is None
+    wait = bucket.reserve(max_wait=2.0)
+    assert 0.9 < wait <= 1.0
+    # The shed call above left the queue untouched.
+    assert 1.9 < bucket.reserve() <= 2.0
+
+
+def test_call_sheds_instead_of_queueing_past_its_deadline(make_policy):
+    p = make_policy("shedding", RPS=1, BURST=1)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        return "ok"
+
+    async def main():
+        assert await resilience.call("shedding", fn) == "ok"
+        with pytest.raises(resilience.RateLimitedError):
+            await resilience.call("shedding", fn, deadline=time.monotonic() + 0.2)
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert p.stats()["shed"] == 1
+
+
+def test_cancelled_waiter_gets_its_token_back(make_policy):
+    p = make_policy("refund", RPS=1, BURST=1)
+
+    async def fn():
+        return "ok"
+
+    async def main():
+        await resilience.call("refund", fn)
+        waiter = asyncio.ensure_future(resilience.call("refund", fn))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    # Without the refund the next caller would queue behind the cancelled one (~2s).
+    assert p.bucket.reserve() < 1.0
+
+
+def test_every_retry_passes_the_breaker(make_policy, monkeypatch):
+    p = make_policy("breaker_retry", RETRIES=3)
+    attempts = []
+
+    def backoff(attempt):
+        # Another caller opens the breaker while this one backs off.
+        p.breaker.opened_at = time.monotonic()
+        return 0.0
+
+    monkeypatch.setattr(resilience, "_backoff", backoff)
+
+    def fn():
+        attempts.append(1)
+        _timeout()
+
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.call_sync("breaker_retry", fn)
+    assert len(attempts) == 1
+    assert p.stats()["rejected"] == 1
+
+
+def test_every_retry_takes_a_token(make_policy, monkeypatch):
+    monkeypatch.setattr(resilience, "MAX_WAIT_S", 0.1)
+    make_policy("bucket_retry", RPS=0.5, BURST=1, RETRIES=3)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        _timeout()
+
+    with pytest.raises(resilience.RateLimitedError):
+        resilience.call_sync("bucket_retry", fn)
+    assert len(attempts) == 1
+
+
+def test_retries_transient_errors_then_succeeds(make_policy):
+    p = make_policy("flaky", RETRIES=2)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) < 3:
+            _timeout()
+        return "ok"
+
+    assert resilience.call_sync("flaky", fn) == "ok"
+    assert p.stats()["calls"] == 3
+    assert p.stats()["retries"] == 2
+    assert p.breaker.state == "closed"
@@ -0,0 +1,55 @@
+import numpy as np
+
+from backend import geo, scoring
+
+
+def test_top_k_matches_stable_descending_sort():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        scores = rng.integers(0, 5, size=rng.integers(1, 30)).astype(float)
+        expected = np.argsort(-scores, kind="stable").tolist()
+        for k in (1, 3, len(scores), len(scores) + 2):
+            assert scoring.top_k(scores, k) == expected[:k]
+
+
+def test_top_k_edge_cases():
+    assert scoring.top_k(np.zeros(0), 3) == []
+    assert scoring.top_k(np.array([0.5, 0.9]), 0) == []
+    assert scoring.top_k(np.array([0.2, 0.9, 0.9, 0.1]), 2) == [1, 2]
+
+
+def test_scores_stay_in_unit_range_and_rank_closer_first():
+    merged = {"vibe": "chill", "budget_cap": 20, "likes": ["jazz"], "distance_cap": 10}
+    perfect = {"vibe": "chill", "price": "free", "tags": ["jazz"], "distance_km": 0.0}
+    farther = dict(perfect, distance_km=5.0)
+    plain = {"vibe": "loud", "price": "$$$", "tags": []}
+    scores = scoring.score_candidates([perfect, farther, plain], merged)
+    assert scores[0] == 1.0
+    assert 0.0 < scores[2] < scores[1] < scores[0]
+
+    # Without a distance cap the best possible candidate also scores exactly 1.
+    no_cap = scoring.score_candidates([perfect], {"vibe": "chill", "likes": ["jazz"]})
+    assert no_cap[0] == 1.0
+
+
+def test_apply_distances_sets_distance_and_filters_by_cap():
+    origin = (42.3736, -71.1097)  # Harvard Square
+    candidates = [
+        {"id": "near", "lat": 42.3770, "lng": -71.1167},
+        {"id": "far", "lat": "42.3601", "lng": "-71.0589"},  # Eventbrite-style strings
+        {"id": "unknown"},
+    ]
+    kept = geo.apply_distances(candidates, origin, distance_cap=2)
+    assert [c["id"] for c in kept] == ["near", "unknown"]
+    assert 0.5 < kept[0]["distance_km"] < 1.0
+    assert "distance_km" not in kept[1]
+
+    everything = geo.apply_distances(candidates, origin)
+    assert [c["id"] for c in everything] == ["near", "far", "unknown"]
+    assert 4.0 < everything[1]["distance_km"] < 5.0
+
+
+def test_apply_distances_without_origin_is_a_no_op():
+    candidates = [{"id": "a", "lat": 1.0, "lng": 2.0}]
+    assert geo.apply_distances(candidates, None, distance_cap=1) is candidates
+    assert "distance_km" not in candidates[0]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from backend.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test-share")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"items": [1, 2]}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [{"items": [1, 2]}] * 5
+    # Each caller gets its own copy.
+    results[0]["items"].append(3)
+    assert results[1]["items"] == [1, 2]
+    assert flight.stats()["upstream_calls"] == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_and_later_calls_are_not_shared():
+    flight = SingleFlight("test-keys")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    async def main():
+        first = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+        second = await flight.do("a", lambda: fetch("a"))
+        return first, second
+
+    assert asyncio.run(main()) == (["a", "b"], "a")
+    assert calls == ["a", "b", "a"]
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test-cancel")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do("k", fetch))
+        patient = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == "done"
+    assert flight.stats()["upstream_calls"] == 1
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight("test-error")
+    attempts = []
+
+    async def fail():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("k", fail)
+
+    asyncio.run(main())
+    assert len(attempts) == 2
@@ -0,0 +1,87 @@
+import os
+import random
+import subprocess
+import sys
+
+from backend.schemas import UserTaste
+from backend.taste_merge import GroupTaste, TasteMergeEngine, member_key
+
+_VIBES = ["chill", "music", "outdoors", "party", "food"]
+_LIKES = ["jazz", "tacos", "hiking", "trivia", "art", "coffee"]
+
+
+def _taste(rng, uid, version=None):
+    return UserTaste(
+        user_id=uid,
+        vibes=rng.sample(_VIBES, rng.randint(0, 2)),
+        likes=rng.sample(_LIKES, rng.randint(0, 3)),
+        tags=rng.sample(_LIKES, rng.randint(0, 2)),
+        budget_max=rng.choice([None, 10, 25, 40]),
+        distance_km_max=rng.choice([None, 2, 5, 8]),
+        version=version,
+    )
+
+
+def _full(tastes):
+    group = GroupTaste()
+    for taste in tastes:
+        group.add(taste)
+    return group.merged()
+
+
+def test_incremental_merges_match_full_recompute():
+    rng = random.Random(11)
+    engine = TasteMergeEngine(maxsize=64)
+    people = {f"u{i}": _taste(rng, f"u{i}", version="1") for i in range(8)}
+    group = ["u0", "u1", "u2"]
+    for step in range(200):
+        op = rng.random()
+        outside = [uid for uid in people if uid not in group]
+        if op < 0.3 and outside:
+            group = group + [rng.choice(outside)]
+        elif op < 0.6 and len(group) > 1:
+            group = [uid for uid in group if uid != rng.choice(group)]
+        else:
+            # Edit one member's profile.
+            uid = rng.choice(group)
+            people[uid] = _taste(rng, uid, version=str(step))
+        tastes = [people[uid] for uid in rng.sample(group, len(group))]
+        assert engine.merge(tastes) == _full(tastes)
+    stats = engine.stats()
+    assert stats["incremental"] > 0
+    assert stats["hits"] + stats["incremental"] + stats["rebuilds"] == 200
+
+
+def test_removing_a_member_undoes_adding_it():
+    rng = random.Random(3)
+    base = [_taste(rng, f"u{i}") for i in range(3)]
+    extra = _taste(rng, "u9")
+    group = GroupTaste()
+    for taste in base:
+        group.add(taste)
+    before = group.merged()
+    group.add(extra)
+    group.remove(member_key(extra))
+    assert group.merged() == before
+
+
+def test_duplicate_members_count_twice():
+    chill = UserTaste(user_id="a", vibes=["chill"])
+    party = UserTaste(user_id="b", vibes=["party"])
+    engine = TasteMergeEngine()
+    assert engine.merge([chill, party, party])["merged_vibe"] == "party"
+    assert engine.merge([chill, party])["merged_vibe"] == _full([chill, party])["merged_vibe"]
+
+
+def test_member_key_is_stable_across_processes():
+    taste = UserTaste(user_id="a", vibes=["chill"], likes=["jazz"], budget_max=20)
+    script = (
+        "from backend.schemas import UserTaste; from backend.taste_merge import member_key; "
+        "print(member_key(UserTaste(user_id='a', vibes=['chill'], likes=['jazz'], budget_max=20))[1])"
+    )
+    other = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert other.stdout.strip() == member_key(taste)[1]
+    assert member_key(taste) != member_key(UserTaste(user_id="a", vibes=["chill"], likes=["jazz"], budget_max=25))
@@ -0,0 +1,29 @@
+import asyncio
+
+import httpx
+
+from backend import tools
+
+
+def test_eventbrite_address_fallback_runs_once(monkeypatch):
+    calls = []
+
+    async def fake_geocode(location):
+        return (42.3736, -71.1097)
+
+    async def not_found(upstream, url, **kwargs):
+        calls.append(dict(kwargs["params"]))
+        request = httpx.Request("GET", url)
+        raise httpx.HTTPStatusError("not found", request=request, response=httpx.Response(404, request=request))
+
+    monkeypatch.setenv("EVENTBRITE_API_KEY", "test-token")
+    monkeypatch.setattr(tools, "_geocode_location", fake_geocode)
+    monkeypatch.setattr(tools, "_http_get", not_found)
+
+    result = asyncio.run(tools._fetch_eventbrite_events({"location": "Cambridge, MA", "vibe": "chill"}))
+
+    assert result == []
+    assert len(calls) == 2
+    assert "location.latitude" in calls[0]
+    assert calls[1]["location.address"] == "Cambridge, MA"
+    assert "location.latitude" not in calls[1]